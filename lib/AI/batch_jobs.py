@@ -0,0 +1,209 @@
+import argparse
+import dataclasses
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import prompt
+
+DONE = "done"
+FAILED = "failed"
+
+# RESOURCE_EXHAUSTED: the quota ran out, the unit itself is fine.
+QUOTA_CODE = 429
+
+
+def unit_key(unit):
+    """Content hash identifying a work unit across runs."""
+    return hashlib.sha256(json.dumps(unit, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def shard_of(key, shards):
+    return int(key[:16], 16) % shards
+
+
+def audit_units(groups, documents=None):
+    """Work units for an end-of-semester audit.
+
+    One "compare" unit per pair of {group_id: description} and one
+    "evaluate" unit per {group_id: document_text}.
+    """
+    for (id_1, description_1), (id_2, description_2) in itertools.combinations(sorted(groups.items()), 2):
+        yield {"kind": "compare", "groups": [id_1, id_2], "description_1": description_1, "description_2": description_2}
+    for group_id, text in sorted((documents or {}).items()):
+        yield {"kind": "evaluate", "group": group_id, "text": text}
+
+
+def _compare(unit, cache):
+    return {"similarity": prompt.model_similarity(unit["description_1"], unit["description_2"], cache=cache)}
+
+
+def _evaluate(unit, cache):
+    import structured
+
+    return {"scores": dataclasses.asdict(structured.evaluate(unit["text"], cache=cache))}
+
+
+HANDLERS = {"compare": _compare, "evaluate": _evaluate}
+
+
+def read_journal(journal_dir):
+    """{key: latest entry} over every shard journal in journal_dir.
+
+    Each entry's "attempts" counts its journaled failures and successes,
+    not counting failures caused by the quota. A torn last line (the
+    process died mid-write) is ignored.
+    """
+    entries = {}
+    if not os.path.isdir(journal_dir):
+        return entries
+    for name in sorted(os.listdir(journal_dir)):
+        if not (name.startswith("journal-") and name.endswith(".jsonl")):
+            continue
+        with open(os.path.join(journal_dir, name), encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                attempts = 0 if entry.get("quota") else 1
+                previous = entries.get(entry["key"])
+                if previous is None:
+                    entries[entry["key"]] = {**entry, "attempts": attempts}
+                    continue
+                # A unit may appear in several shard journals when the shard
+                # count changes between runs; the newest entry wins.
+                latest = entry if entry["time"] >= previous["time"] else previous
+                entries[entry["key"]] = {**latest, "attempts": previous["attempts"] + attempts}
+    return entries
+
+
+def _end_journal(path):
+    """Terminate a torn last line of the journal at path.
+
+    Otherwise the next entry would be appended to it and both would be
+    skipped as one unreadable line.
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, "rb+") as file:
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) != b"\n":
+            file.write(b"\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def run_shard(units_path, journal_dir, shard=0, shards=1, max_attempts=3, max_consecutive_failures=20, cache_path=None):
+    """Process this shard's units from a JSONL file, journaling each result.
+
+    Units already journaled as done are skipped; failed units are retried
+    until they have failed max_attempts times, after which they are given
+    up. Quota errors (429) do not count as attempts. The shard stops early
+    after max_consecutive_failures failures in a row (e.g. quota exhausted)
+    so a later resume picks up from there. Returns (done, failed, skipped,
+    given_up).
+    """
+    os.makedirs(journal_dir, exist_ok=True)
+    journal = read_journal(journal_dir)
+    journal_path = os.path.join(journal_dir, f"journal-{shard}.jsonl")
+    _end_journal(journal_path)
+    cache = None
+    if cache_path:
+        import cache as cache_module
+
+        cache = cache_module.ResponseCache(cache_path)
+
+    done = failed = skipped = given_up = consecutive = 0
+    with open(units_path, encoding="utf-8") as units, open(journal_path, "a", encoding="utf-8") as log:
+        for unit in prompt.read_jsonl(units):
+            if isinstance(unit, prompt.MalformedLine):
+                # Every shard reads the whole file; count it once.
+                failed += shard == 0
+                continue
+            key = unit_key(unit)
+            if shard_of(key, shards) != shard:
+                continue
+            previous = journal.get(key)
+            if previous and previous["status"] == DONE:
+                skipped += 1
+                continue
+            if previous and previous["attempts"] >= max_attempts:
+                given_up += 1
+                continue
+            entry = {"key": key, "kind": unit["kind"], "time": time.time()}
+            try:
+                entry.update(status=DONE, result=HANDLERS[unit["kind"]](unit, cache))
+                done += 1
+                consecutive = 0
+            except Exception as error:
+                entry.update(status=FAILED, error=f"{type(error).__name__}: {error}")
+                if getattr(error, "code", None) == QUOTA_CODE:
+                    entry["quota"] = True
+                failed += 1
+                consecutive += 1
+            for field in ("groups", "group"):
+                if field in unit:
+                    entry[field] = unit[field]
+            log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+            if consecutive >= max_consecutive_failures:
+                break
+    return done, failed, skipped, given_up
+
+
+def _run_shard_process(arguments):
+    return run_shard(*arguments)
+
+
+def run(units_path, journal_dir, shards=1, max_attempts=3, max_consecutive_failures=20, cache_path=None):
+    """Run every shard in its own worker process and return summed counts."""
+    arguments = [
+        (units_path, journal_dir, shard, shards, max_attempts, max_consecutive_failures, cache_path)
+        for shard in range(shards)
+    ]
+    if shards == 1:
+        return run_shard(*arguments[0])
+    with multiprocessing.Pool(shards) as pool:
+        results = pool.map(_run_shard_process, arguments)
+    return tuple(sum(counts) for counts in zip(*results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checkpointed, resumable cohort audit jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_command = commands.add_parser("run", help="run (or resume) a job from a JSONL file of work units")
+    run_command.add_argument("units", help='JSONL work units: {"kind": "compare"|"evaluate", ...}')
+    run_command.add_argument("--journal", required=True, help="journal directory")
+    run_command.add_argument("--shards", type=int, default=1, help="worker processes")
+    run_command.add_argument("--max-attempts", type=int, default=3)
+    run_command.add_argument("--max-consecutive-failures", type=int, default=20)
+    run_command.add_argument("--cache", metavar="PATH", help="SQLite response cache file")
+    status_command = commands.add_parser("status", help="summarize a journal")
+    status_command.add_argument("--journal", required=True)
+    status_command.add_argument("--max-attempts", type=int, default=3, help="as given to run")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        done, failed, skipped, given_up = run(
+            args.units, args.journal, args.shards, args.max_attempts, args.max_consecutive_failures, args.cache
+        )
+        print(json.dumps({"done": done, "failed": failed, "skipped": skipped, "given_up": given_up}))
+        return
+    entries = read_journal(args.journal).values()
+    failed = [entry for entry in entries if entry["status"] == FAILED]
+    given_up = sum(entry["attempts"] >= args.max_attempts for entry in failed)
+    print(json.dumps({
+        DONE: sum(entry["status"] == DONE for entry in entries),
+        FAILED: len(failed) - given_up,
+        "given_up": given_up,
+    }))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
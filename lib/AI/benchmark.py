@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import time
+
+import fake_client
+import fanout
+import prompt
+import structured
+
+WORKLOADS = ("single", "batched", "concurrent")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def recorded_streams(chunk_size=48):
+    """The few-shot comparison answers, split into chunks like a live stream."""
+    answers = [
+        prompt.content_text(content)
+        for content in prompt.few_shots()[1::2]
+        if prompt.parse_similarity(prompt.content_text(content)) is not None
+    ]
+    return [[answer[i:i + chunk_size] for i in range(0, len(answer), chunk_size)] for answer in answers]
+
+
+def cohort(size, seed=0):
+    """Deterministic synthetic group descriptions built from the few-shot text."""
+    words = re.findall(r"[A-Za-z]+", prompt.COMPARE_INSTRUCTIONS + " ".join(
+        prompt.content_text(content) for content in prompt.few_shots()
+    ))
+    rng = random.Random(seed)
+    return {f"group-{i}": " ".join(rng.choice(words) for _ in range(rng.randint(60, 140))) for i in range(size)}
+
+
+def _batch_responder(contents):
+    candidates = len(re.findall(r"^Candidate \d+:", fake_client.last_user_text(contents), re.M))
+    return json.dumps({"similarities": [{"candidate": n, "similarity": 0} for n in range(1, candidates + 1)]})
+
+
+def _client(args, workload):
+    options = dict(
+        latency=args.first_chunk,
+        chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    if workload == "batched":
+        return fake_client.FakeClient(_batch_responder, **options)
+    return fake_client.FakeClient.replaying(recorded_streams(), **options)
+
+
+def run_workload(workload, size, args):
+    groups = cohort(size, args.seed)
+    new_description = cohort(1, args.seed + 1)["group-0"]
+    client = _client(args, workload)
+    failures = 0
+    start = time.perf_counter()
+    if workload == "single":
+        for description in groups.values():
+            try:
+                prompt.generate(prompt.comparison_prompt(new_description, description), echo=False, client=client)
+            except fake_client.FakeAPIError:
+                failures += 1
+    elif workload == "batched":
+        for keys in prompt.plan_batches(new_description, groups, args.token_budget):
+            try:
+                structured.compare_batch(new_description, {key: groups[key] for key in keys}, client=client)
+            except fake_client.FakeAPIError:
+                failures += len(keys)
+    else:
+        engine = fanout.FanOut(client=client, concurrency=args.concurrency, base_delay=0.01, max_delay=0.1)
+
+        async def consume():
+            failed = 0
+            async for _, similarity, text in fanout.compare_many(new_description, groups, engine):
+                failed += isinstance(text, Exception)
+            return failed
+
+        failures = asyncio.run(consume())
+    wall = time.perf_counter() - start
+
+    succeeded = [record for record in client.records if record.error is None]
+    latencies = [record.end - record.start for record in succeeded]
+    first_chunks = [record.first_chunk for record in succeeded if record.first_chunk is not None]
+    return {
+        "workload": workload,
+        "cohort": size,
+        "requests": len(client.records),
+        "errors": len(client.records) - len(succeeded),
+        "failed_pairs": failures,
+        "wall_s": wall,
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p95_ms": _ms(percentile(latencies, 0.95)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+        "ttfc_p50_ms": _ms(percentile(first_chunks, 0.50)),
+        "requests_per_s": len(succeeded) / wall if wall else None,
+        "pairs_per_s": (size - failures) / wall if wall else None,
+        "tokens_per_s": sum(record.output_tokens for record in succeeded) / wall if wall else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000.0
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AI paths against a fake genai client.")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000], help="cohort sizes")
+    parser.add_argument("--first-chunk", type=float, default=0.02, help="time to first chunk (s)")
+    parser.add_argument("--chunk-delay", type=float, default=0.002, help="delay between chunks (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--token-budget", type=int, default=16_000, help="batched mode token budget")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print one JSON object per result")
+    args = parser.parse_args(argv)
+
+    columns = ("workload", "cohort", "requests", "errors", "wall_s", "p50_ms", "p95_ms", "p99_ms",
+               "ttfc_p50_ms", "requests_per_s", "pairs_per_s", "tokens_per_s")
+    if not args.json:
+        print("\t".join(columns))
+    for size in args.sizes:
+        for workload in args.workloads:
+            result = run_workload(workload, size, args)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print("\t".join(_format(result[column]) for column in columns))
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
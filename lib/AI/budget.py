@@ -0,0 +1,208 @@
+import collections
+import math
+import re
+from dataclasses import dataclass
+
+import lsh
+import prompt
+import stream_parser
+
+REPEATED = "[same text as in an earlier example]"
+
+COMPARE = "compare"
+EVALUATE = "evaluate"
+
+# A sentence, bullet or line, with the whitespace that follows it.
+_SENTENCE = re.compile(r"\S.*?(?:[.!?]+(?=\s)|(?=\n)|\Z)\s*", re.S)
+_DESCRIPTION = re.compile(r"Description [12]:\s*(.*?)(?=\s*Description 2:|\s*Please analyze|\Z)", re.S)
+
+
+def task_kind(text):
+    if "Description 1:" in text:
+        return COMPARE
+    if "Evaluate the given text" in text:
+        return EVALUATE
+    return None
+
+
+def split_sentences(text):
+    """Sentence, bullet and line units of text, each with its trailing whitespace."""
+    return [match.group() for match in _SENTENCE.finditer(text)]
+
+
+@dataclass(slots=True, frozen=True)
+class Assembly:
+    user_input: str
+    contents: list
+    tokens: int
+    baseline_tokens: int
+    examples: int
+
+    @property
+    def tokens_saved(self):
+        return max(0, self.baseline_tokens - self.tokens)
+
+
+class PromptBudget:
+    """Assembles the prompt for one call within a token budget.
+
+    * Inputs longer than their share of the budget lose their least salient
+      sentences first. Salience is a sentence's IDF-weighted cosine
+      similarity with the rest of its input, so generic sentences about the
+      report itself ("It includes system architecture diagrams (ERD, DFD,
+      UML), marketing strategy, ...") go before the ones stating the idea.
+      IDF comes from the few-shot descriptions plus `reference` texts.
+    * Only few-shot examples of the same task are used, scored answers only
+      (the evaluation template is dropped), ranked so each new example adds
+      a score not shown yet, then shortest first. Examples are added until
+      max_examples or the budget is reached.
+    * Text repeated from an earlier turn (the GradEase description, the
+      instruction block) is replaced by a short back-reference when the
+      repeated run is at least min_repeat_tokens long.
+    """
+
+    def __init__(
+        self, max_tokens=4000, max_examples=3, input_share=0.6, min_repeat_tokens=40, reference=(), count=None
+    ):
+        self.max_tokens = max_tokens
+        self.max_examples = max_examples
+        self.input_share = input_share
+        self.min_repeat_tokens = min_repeat_tokens
+        self.count = count or prompt.estimate_tokens
+        self._examples = self._scored_examples(prompt.few_shots())
+        self._idf = self._inverse_document_frequencies(list(reference))
+
+    @staticmethod
+    def _scored_examples(history):
+        examples = []
+        for question, answer in zip(history[::2], history[1::2]):
+            parser = stream_parser.StreamParser()
+            parser.feed(prompt.content_text(answer))
+            score = parser.scores.get(stream_parser.SIMILARITY, parser.scores.get(stream_parser.TOTAL))
+            if score is not None:
+                examples.append((task_kind(prompt.content_text(question)), score, question, answer))
+        return examples
+
+    def _inverse_document_frequencies(self, reference):
+        texts = list(reference)
+        for kind, _, question, _ in self._examples:
+            if kind == COMPARE:
+                texts.extend(_DESCRIPTION.findall(prompt.content_text(question)))
+        document_frequency = collections.Counter()
+        for text in texts:
+            document_frequency.update(set(lsh.tokenize(text)))
+        total = len(texts)
+        return collections.defaultdict(
+            lambda: math.log(total + 1) + 1,
+            {word: math.log((total + 1) / (count + 1)) + 1 for word, count in document_frequency.items()},
+        )
+
+    def _vector(self, text):
+        return {word: count * self._idf[word] for word, count in collections.Counter(lsh.tokenize(text)).items()}
+
+    def salience(self, sentences):
+        """IDF-weighted cosine of each sentence with the rest of the text."""
+        vectors = [self._vector(sentence) for sentence in sentences]
+        whole = collections.Counter()
+        for vector in vectors:
+            whole.update(vector)
+        scores = []
+        for vector in vectors:
+            rest = {word: weight - vector.get(word, 0.0) for word, weight in whole.items()}
+            dot = sum(weight * rest[word] for word, weight in vector.items())
+            norm = math.sqrt(sum(w * w for w in vector.values())) * math.sqrt(sum(w * w for w in rest.values()))
+            scores.append(dot / norm if norm else 0.0)
+        return scores
+
+    def compress(self, text, max_tokens):
+        """text without its least salient sentences, in original order, within max_tokens."""
+        if self.count(text) <= max_tokens:
+            return text
+        sentences = split_sentences(text)
+        kept = set(range(len(sentences)))
+        used = sum(self.count(sentence) for sentence in sentences)
+        for index in sorted(range(len(sentences)), key=self.salience(sentences).__getitem__):
+            if used <= max_tokens or len(kept) == 1:
+                break
+            kept.discard(index)
+            used -= self.count(sentences[index])
+        return "".join(sentences[index] for index in sorted(kept)).rstrip()
+
+    def _input_tokens(self, instructions):
+        return max(1, int(self.max_tokens * self.input_share) - self.count(instructions))
+
+    def comparison(self, description_1, description_2):
+        limit = self._input_tokens(prompt.COMPARE_INSTRUCTIONS) // 2
+        user_input = prompt.comparison_prompt(self.compress(description_1, limit), self.compress(description_2, limit))
+        return self.fit(user_input, prompt.comparison_prompt(description_1, description_2))
+
+    def evaluation(self, document_text, facts=None):
+        limit = self._input_tokens(prompt.EVALUATE_INSTRUCTIONS + (facts or ""))
+        user_input = prompt.evaluation_prompt(self.compress(document_text, limit), facts)
+        return self.fit(user_input, prompt.evaluation_prompt(document_text, facts))
+
+    def fit(self, user_input, original_input=None):
+        """Assembly of few-shot examples and user_input within max_tokens.
+
+        original_input is the uncompressed input, for the savings baseline.
+        """
+        kind = task_kind(user_input)
+        final = prompt.user_turn(user_input)
+        available = self.max_tokens - self.count(user_input)
+        candidates = [example for example in self._examples if kind is None or example[0] == kind]
+        chosen, shown = [], set()
+        while candidates and len(chosen) < self.max_examples:
+            candidates.sort(key=lambda example: (example[1] in shown, self._example_tokens(example)))
+            example = candidates.pop(0)
+            trial = sorted([*chosen, example], key=self._examples.index)
+            if self._tokens(self._deduplicate(trial)) > available:
+                break
+            chosen, shown = trial, shown | {example[1]}
+        contents = [*self._deduplicate(chosen), final]
+        baseline = prompt.build_contents(original_input or user_input)
+        return Assembly(user_input, contents, self._tokens(contents), self._tokens(baseline), len(chosen))
+
+    def _example_tokens(self, example):
+        return self.count(prompt.content_text(example[2])) + self.count(prompt.content_text(example[3]))
+
+    def _tokens(self, contents):
+        return sum(self.count(prompt.content_text(content)) for content in contents)
+
+    def _deduplicate(self, examples):
+        seen, contents = set(), []
+        for _, _, question, answer in examples:
+            for content in (question, answer):
+                text = self._replace_repeats(prompt.content_text(content), seen)
+                contents.append({"role": content["role"], "parts": [{"text": text}]})
+        return contents
+
+    def _replace_repeats(self, text, seen):
+        """Replace runs of lines already seen in earlier turns; updates seen.
+
+        Short lines ending in ":" ("Description 2:") are labels: they are
+        kept and end a run, so the structure around a reference survives.
+        """
+        lines = text.split("\n")
+        output, run = [], []
+
+        def flush():
+            if self.count("\n".join(run)) >= self.min_repeat_tokens:
+                output.append(REPEATED)
+            else:
+                output.extend(run)
+            run.clear()
+
+        for line in lines:
+            key = line.strip()
+            label = key.endswith(":") and self.count(key) < 8
+            if key and not label and key in seen:
+                run.append(line)
+                continue
+            if not key and run:
+                run.append(line)
+                continue
+            flush()
+            output.append(line)
+        flush()
+        seen.update(line.strip() for line in lines if line.strip())
+        return "\n".join(output)
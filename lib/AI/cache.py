@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def _dump(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return value
+
+
+def cache_key(model, contents, config):
+    """Content hash of everything that determines a model response."""
+    payload = json.dumps(
+        {"model": model, "contents": _dump(contents), "config": _dump(config)},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed cache of streamed responses with LRU and TTL eviction.
+
+    Each entry keeps the response as its list of chunk texts so a hit can be
+    replayed chunk by chunk, exactly as the model streamed it.
+    """
+
+    def __init__(self, path="prompt_cache.sqlite3", max_entries=10_000, max_bytes=256 * 1024 * 1024, ttl=30 * 24 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                chunks TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    key = staticmethod(cache_key)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT chunks, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, chunks):
+        data = json.dumps(list(chunks), ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, chunks, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def stream(self, key):
+        """Replay a cached response chunk by chunk, or None on a miss."""
+        chunks = self.get(key)
+        return None if chunks is None else iter(chunks)
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        stale = []
+        for key, entry_size in rows:
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            size -= entry_size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._db.close()
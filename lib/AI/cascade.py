@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+import lsh
+import prompt
+
+LOCAL = "local"
+CHEAP = "cheap"
+LARGE = "large"
+
+
+@dataclass(slots=True, frozen=True)
+class Verdict:
+    similarity: float
+    plagiarised: bool
+    tier: str
+    model: str | None = None
+
+
+class Cascade:
+    """Tiered plagiarism decisions: local score first, models only when needed.
+
+    * The local lexical score (Jaccard of the word sets without stopwords,
+      0-1) settles a pair when it is below `negative_below` or at least
+      `positive_above`. On the few-shot descriptions, unrelated pairs (model
+      scores 0-15%) are 0.03-0.15, a copy with half its words replaced is
+      0.28-0.34 and one with a tenth replaced 0.78 or more.
+    * Pairs in between go to `cheap_model`.
+    * If the cheap model's percentage is within `margin` points of
+      `plagiarism_threshold`, the pair goes to `large_model` for the final
+      answer.
+
+    Every Verdict records the tier that produced it, so the bands can be
+    tuned against cost and latency.
+    """
+
+    def __init__(
+        self,
+        negative_below=0.2,
+        positive_above=0.6,
+        plagiarism_threshold=50.0,
+        margin=15.0,
+        cheap_model="gemini-2.0-flash-lite",
+        large_model=prompt.MODEL,
+        local_scorer=lsh.content_jaccard,
+        model_scorer=prompt.model_similarity,
+        cache=None,
+        client=None,
+    ):
+        self.negative_below = negative_below
+        self.positive_above = positive_above
+        self.plagiarism_threshold = plagiarism_threshold
+        self.margin = margin
+        self.cheap_model = cheap_model
+        self.large_model = large_model
+        self.local_scorer = local_scorer
+        self.model_scorer = model_scorer
+        self.cache = cache
+        self.client = client
+
+    def _model(self, model, description_1, description_2):
+        return self.model_scorer(description_1, description_2, cache=self.cache, client=self.client, model=model)
+
+    def decide(self, description_1, description_2):
+        local = self.local_scorer(description_1, description_2)
+        if local < self.negative_below or local >= self.positive_above:
+            similarity = local * 100
+            return Verdict(similarity, similarity >= self.plagiarism_threshold, LOCAL)
+
+        cheap = self._model(self.cheap_model, description_1, description_2)
+        if cheap is not None and abs(cheap - self.plagiarism_threshold) > self.margin:
+            return Verdict(cheap, cheap >= self.plagiarism_threshold, CHEAP, self.cheap_model)
+
+        large = self._model(self.large_model, description_1, description_2)
+        if large is None:
+            # No parseable percentage from the large model; fall back to the
+            # best score we have rather than failing the whole check.
+            if cheap is not None:
+                return Verdict(cheap, cheap >= self.plagiarism_threshold, CHEAP, self.cheap_model)
+            return Verdict(local * 100, local * 100 >= self.plagiarism_threshold, LOCAL)
+        return Verdict(large, large >= self.plagiarism_threshold, LARGE, self.large_model)
+
+    def decide_many(self, new_description, groups):
+        """{group_id: Verdict} for new_description against {group_id: description}."""
+        return {group_id: self.decide(new_description, description) for group_id, description in groups.items()}
@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+import re
+import unicodedata
+
+import cache
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def _normalize_content(content):
+    parts = [{**part, "text": normalize_text(part["text"])} if "text" in part else part for part in content["parts"]]
+    return {**content, "parts": parts}
+
+
+def request_key(model, contents, config):
+    """cache_key of the request with whitespace and Unicode forms normalized.
+
+    Two saves of the same description that differ only in spacing or line
+    breaks share one upstream call.
+    """
+    return cache.cache_key(model, [_normalize_content(content) for content in contents], config)
+
+
+class _Flight:
+    __slots__ = ("chunks", "done", "error", "subscribers", "task", "event")
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.event = asyncio.Event()
+
+    def wake(self):
+        # A fresh Event per change: every waiter of the old one is released,
+        # and one subscriber being cancelled never affects the others.
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+
+class SingleFlight:
+    """Share one upstream stream between concurrent identical requests.
+
+    The first request for a key starts the upstream stream in its own task;
+    requests for the same key that arrive while it runs replay the chunks
+    received so far and then get each new chunk as it arrives. When every
+    subscriber has gone (finished, closed or cancelled) before the stream
+    ends, the upstream call is cancelled. Finished flights are forgotten;
+    repeats after that are the response cache's job.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    key = staticmethod(request_key)
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def stream(self, key, start):
+        """Yield the chunks of the flight for key, starting it with start() if needed.
+
+        start() must return an async iterator of text chunks.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.ensure_future(self._run(key, flight, start()))
+            self.upstream_calls += 1
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    index += 1
+                    yield flight.chunks[index - 1]
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.event.wait()
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.done:
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    async def _run(self, key, flight, chunks):
+        try:
+            async with contextlib.aclosing(chunks):
+                async for text in chunks:
+                    flight.chunks.append(text)
+                    flight.wake()
+        except Exception as error:
+            flight.error = error
+        finally:
+            flight.done = True
+            flight.wake()
+            self._forget(key, flight)
+
+    def _forget(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
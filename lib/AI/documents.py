@@ -0,0 +1,187 @@
+# To run this code you need to install the following dependencies:
+# pip install google-genai pypdf python-docx
+
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+
+import fanout as fanout_module
+import prompt
+import structured
+
+# Lines that open a new section in extracted PDF text: "Chapter 3", "2.1 System
+# Design", "Introduction", ...
+_SECTION_HEADING = re.compile(
+    r"^\s*(chapter\s+\d+\b|\d+(\.\d+)*\.?\s+[A-Z]|(abstract|introduction|conclusion|references|acknowledg\w*)\b)",
+    re.IGNORECASE,
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _pdf_paragraphs(path):
+    from pypdf import PdfReader
+
+    for page in PdfReader(path).pages:
+        for block in re.split(r"\n\s*\n", page.extract_text() or ""):
+            for line_group in _split_headings(block):
+                yield line_group
+
+
+def _split_headings(block):
+    """Split a PDF text block so each section heading starts its own paragraph."""
+    lines, current = [], []
+    for line in block.splitlines():
+        if _SECTION_HEADING.match(line) and len(line) < 80:
+            if current:
+                lines.append(("\n".join(current), False))
+            lines.append((line.strip(), True))
+            current = []
+        elif line.strip():
+            current.append(line)
+    if current:
+        lines.append(("\n".join(current), False))
+    return lines
+
+
+def _docx_paragraphs(path):
+    from docx import Document
+
+    for paragraph in Document(path).paragraphs:
+        text = paragraph.text.strip()
+        if text:
+            style = paragraph.style.name if paragraph.style is not None else ""
+            yield text, style.startswith("Heading") or style == "Title"
+
+
+def _text_paragraphs(path):
+    with open(path, encoding="utf-8") as file:
+        block = []
+        for line in file:
+            if line.strip():
+                block.append(line.rstrip("\n"))
+            elif block:
+                yield from _split_headings("\n".join(block))
+                block = []
+        if block:
+            yield from _split_headings("\n".join(block))
+
+
+def iter_paragraphs(path):
+    """Yield (text, is_heading) pairs from a PDF, DOCX or plain-text file.
+
+    Pages and paragraphs are read one at a time, so large reports are never
+    held in memory as a single string.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return _pdf_paragraphs(path)
+    if extension == ".docx":
+        return _docx_paragraphs(path)
+    return _text_paragraphs(path)
+
+
+def _split_long(text, max_tokens):
+    piece = []
+    for sentence in _SENTENCE_END.split(text):
+        if piece and prompt.estimate_tokens(" ".join(piece + [sentence])) > max_tokens:
+            yield " ".join(piece)
+            piece = []
+        piece.append(sentence)
+    if piece:
+        yield " ".join(piece)
+
+
+def chunk_document(paragraphs, max_tokens=6000, min_tokens=None):
+    """Group paragraphs into chunks of at most max_tokens estimated tokens.
+
+    A chunk ends at a section heading once it holds min_tokens (default half
+    of max_tokens), so chunks follow the document's own sections where they
+    can. Paragraphs longer than max_tokens are split at sentence ends.
+    """
+    min_tokens = max_tokens // 2 if min_tokens is None else min_tokens
+    chunk, used = [], 0
+    for text, is_heading in paragraphs:
+        if chunk and is_heading and used >= min_tokens:
+            yield "\n\n".join(chunk)
+            chunk, used = [], 0
+        for piece in _split_long(text, max_tokens):
+            cost = prompt.estimate_tokens(piece)
+            if chunk and used + cost > max_tokens:
+                yield "\n\n".join(chunk)
+                chunk, used = [], 0
+            chunk.append(piece)
+            used += cost
+    if chunk:
+        yield "\n\n".join(chunk)
+
+
+class IncompleteEvaluation(Exception):
+    """Too little of the document could be scored to grade it."""
+
+
+@dataclass(slots=True, frozen=True)
+class DocumentEvaluation:
+    """A merged grade and how much of the document it is based on."""
+
+    evaluation: structured.Evaluation
+    chunks: int
+    scored_chunks: int
+    coverage: float
+    errors: tuple
+
+    @property
+    def complete(self):
+        return self.scored_chunks == self.chunks
+
+
+def merge_evaluations(scored):
+    """Combine (Evaluation, weight) pairs into one weighted Evaluation."""
+    total_weight = sum(weight for _, weight in scored)
+    if not total_weight:
+        raise ValueError("no scored chunks to merge")
+    return structured.Evaluation(
+        **{
+            field: round(sum(getattr(evaluation, field) * weight for evaluation, weight in scored) / total_weight, 1)
+            for field in structured.Evaluation.__slots__
+        }
+    )
+
+
+async def _score_chunk(fanout, text):
+    user_input = prompt.evaluation_prompt(text)
+    response = await fanout.generate(
+        user_input,
+        contents=structured.json_contents(user_input),
+        config=structured.json_config(structured.EVALUATION_SCHEMA),
+    )
+    return structured.decode_evaluation(response), prompt.estimate_tokens(text)
+
+
+async def evaluate_document(path, fanout=None, max_tokens=6000, min_coverage=0.8):
+    """Score every chunk of a document concurrently and merge the results.
+
+    Each chunk is graded with the 9-criterion rubric and weighted by its
+    length. Returns a DocumentEvaluation; chunks that still fail after
+    FanOut's retries are left out of the merge but counted, and their
+    errors kept. When the scored chunks hold less than min_coverage of the
+    document's tokens, IncompleteEvaluation is raised from the first error.
+    """
+    fanout = fanout or fanout_module.FanOut()
+    tasks, weights = [], []
+    for text in chunk_document(iter_paragraphs(path), max_tokens):
+        tasks.append(asyncio.ensure_future(_score_chunk(fanout, text)))
+        weights.append(prompt.estimate_tokens(text))
+        # Let the new request start while the next chunk is extracted.
+        await asyncio.sleep(0)
+    if not tasks:
+        raise ValueError(f"no text could be extracted from {path}")
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    scored = [result for result in results if not isinstance(result, BaseException)]
+    errors = tuple(result for result in results if isinstance(result, BaseException))
+    coverage = sum(weight for _, weight in scored) / sum(weights)
+    if coverage < min_coverage:
+        raise IncompleteEvaluation(
+            f"{len(scored)} of {len(results)} chunks of {path} scored ({coverage:.0%} of the text)"
+        ) from (errors[0] if errors else None)
+    return DocumentEvaluation(merge_evaluations(scored), len(results), len(scored), coverage, errors)
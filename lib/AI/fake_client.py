@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import random
+import threading
+import time
+from collections import namedtuple
+
+
+class FakeAPIError(Exception):
+    """Stands in for google.genai.errors.APIError (only `code` is used)."""
+
+    def __init__(self, code, message="fake error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeChunk:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+# One finished (or failed) fake call: wall-clock start/end, time to first
+# chunk, output tokens and the error code (None on success).
+CallRecord = namedtuple("CallRecord", ["start", "end", "first_chunk", "output_tokens", "error"])
+
+
+def default_responder(contents):
+    return "The projects have a **0%** similarity."
+
+
+def _text(content):
+    return "".join(part.get("text") or "" for part in content["parts"])
+
+
+def last_user_text(contents):
+    return _text(contents[-1])
+
+
+def _count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _contents_tokens(contents):
+    return sum(_count_tokens(_text(content)) for content in contents)
+
+
+class _Models:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content_stream(self, model, contents, config=None):
+        return self._client._stream(model, contents, config)
+
+    def generate_content(self, model, contents, config=None):
+        chunks = list(self._client._stream(model, contents, config))
+        return FakeChunk("".join(chunk.text for chunk in chunks), chunks[-1].usage_metadata if chunks else None)
+
+
+class _AsyncModels:
+    def __init__(self, client):
+        self._client = client
+
+    async def generate_content_stream(self, model, contents, config=None):
+        return self._client._astream(model, contents, config)
+
+    async def generate_content(self, model, contents, config=None):
+        chunks = [chunk async for chunk in self._client._astream(model, contents, config)]
+        return FakeChunk("".join(chunk.text for chunk in chunks), chunks[-1].usage_metadata if chunks else None)
+
+
+class _Aio:
+    def __init__(self, client):
+        self.models = _AsyncModels(client)
+
+
+class FakeClient:
+    """Local stand-in for genai.Client with the sync and async model APIs.
+
+    responder(contents) returns the response text, which is streamed in
+    chunk_size pieces: the first after `latency` seconds (time to first
+    chunk), the rest `chunk_delay` seconds apart. A fraction error_rate of
+    calls fails with FakeAPIError(error_code) before the first chunk. With
+    `streams` (recorded lists of chunk texts) the recordings are replayed in
+    turn instead of calling responder. The last chunk carries usage_metadata,
+    and every call is appended to `records`.
+    """
+
+    def __init__(
+        self,
+        responder=default_responder,
+        latency=0.0,
+        chunk_size=64,
+        error_rate=0.0,
+        error_code=429,
+        seed=0,
+        chunk_delay=0.0,
+        streams=None,
+    ):
+        self.responder = responder
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.calls = 0
+        self.records = []
+        self._recorded = itertools.cycle([list(stream) for stream in streams]) if streams else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = _Models(self)
+        self.aio = _Aio(self)
+
+    @classmethod
+    def replaying(cls, streams, **kwargs):
+        """A client that replays recorded streams (lists of chunk texts) in turn."""
+        return cls(streams=streams, **kwargs)
+
+    def _start(self, contents):
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.error_rate
+            recorded = next(self._recorded) if self._recorded is not None else None
+        if failed:
+            return None
+        if recorded is not None:
+            return recorded or [""]
+        text = self.responder(contents)
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+
+    def _chunks(self, pieces, contents):
+        usage = FakeUsage(_contents_tokens(contents), sum(_count_tokens(piece) for piece in pieces))
+        for index, piece in enumerate(pieces):
+            yield FakeChunk(piece, usage if index == len(pieces) - 1 else None)
+
+    def _record(self, start, first_chunk, output_tokens, error):
+        with self._lock:
+            self.records.append(CallRecord(start, time.perf_counter(), first_chunk, output_tokens, error))
+
+    def _stream(self, model, contents, config):
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        pieces = self._start(contents)
+        if pieces is None:
+            self._record(start, None, 0, self.error_code)
+            raise FakeAPIError(self.error_code)
+        first_chunk, output_tokens = None, 0
+        try:
+            for index, chunk in enumerate(self._chunks(pieces, contents)):
+                if index:
+                    time.sleep(self.chunk_delay)
+                else:
+                    first_chunk = time.perf_counter() - start
+                output_tokens += _count_tokens(chunk.text)
+                yield chunk
+        finally:
+            # Also reached when the caller stops reading early.
+            self._record(start, first_chunk, output_tokens, None)
+
+    async def _astream(self, model, contents, config):
+        start = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        pieces = self._start(contents)
+        if pieces is None:
+            self._record(start, None, 0, self.error_code)
+            raise FakeAPIError(self.error_code)
+        first_chunk, output_tokens = None, 0
+        try:
+            for index, chunk in enumerate(self._chunks(pieces, contents)):
+                if index:
+                    await asyncio.sleep(self.chunk_delay)
+                else:
+                    first_chunk = time.perf_counter() - start
+                output_tokens += _count_tokens(chunk.text)
+                yield chunk
+        finally:
+            # Also reached when the caller stops reading early.
+            self._record(start, first_chunk, output_tokens, None)
@@ -0,0 +1,178 @@
+import asyncio
+import random
+import time
+
+import instrumentation
+import prompt
+import scheduler as scheduling
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst if burst is not None else per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount=1):
+        # Requests larger than the bucket would never fit; let them drain it.
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+
+class FanOut:
+    """Run many model calls concurrently on the SDK's async client.
+
+    Calls are bounded by a semaphore, paced by request and token buckets
+    (requests/tokens per minute) and retried with jittered exponential
+    backoff on 429 and 5xx errors. With a scheduler.Scheduler the scheduler's
+    adaptive limit, priority classes and tenants replace the semaphore.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        concurrency=16,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=5,
+        base_delay=1.0,
+        max_delay=32.0,
+        cache=None,
+        scheduler=None,
+    ):
+        self.client = client
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cache = cache
+        self.scheduler = scheduler
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _slot(self, priority, tenant, deadline):
+        if self.scheduler is None:
+            return self._semaphore
+        timeout = None if deadline is None else deadline - time.monotonic()
+        return self.scheduler.slot(priority, tenant, timeout)
+
+    async def generate(
+        self,
+        user_input,
+        contents=None,
+        config=None,
+        model=None,
+        priority=scheduling.NORMAL,
+        tenant=None,
+        timeout=None,
+    ):
+        """Return the full response text for one request.
+
+        priority, tenant and timeout (seconds, over all retries) are only
+        used with a scheduler.
+        """
+        model = model or prompt.MODEL
+        contents = contents if contents is not None else prompt.build_contents(user_input)
+        config = config or prompt.generation_config()
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(model, contents, config)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return "".join(cached)
+
+        if self.client is None:
+            self.client = prompt.make_client()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attempt = 0
+        while True:
+            try:
+                async with self._slot(priority, tenant, deadline):
+                    if self._requests is not None:
+                        await self._requests.acquire()
+                    if self._tokens is not None:
+                        await self._tokens.acquire(prompt.contents_tokens(contents))
+                    call = instrumentation.track(model, prompt.preamble_share(contents))
+                    try:
+                        response = await self.client.aio.models.generate_content(
+                            model=model,
+                            contents=contents,
+                            config=config,
+                        )
+                    except Exception as error:
+                        call.finish(error)
+                        raise
+                    call.chunk(response)
+                    call.finish()
+            except Exception as error:
+                if not is_retryable(error) or attempt >= self.max_retries:
+                    raise
+            else:
+                text = response.text or ""
+                if key is not None:
+                    self.cache.put(key, [text])
+                return text
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def map(self, inputs, **kwargs):
+        """Yield (key, text) for {key: user_input} in completion order.
+
+        A request that fails after all retries yields (key, exception).
+        """
+
+        async def run(key, user_input):
+            try:
+                return key, await self.generate(user_input, **kwargs)
+            except Exception as error:
+                return key, error
+
+        tasks = [asyncio.ensure_future(run(key, user_input)) for key, user_input in inputs.items()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def compare_many(new_desc, existing_descs, fanout=None):
+    """Yield (key, similarity, text) for every existing description.
+
+    existing_descs is a {key: description} mapping or a list (keyed by
+    index). Results arrive in completion order; similarity is None when the
+    call failed or no percentage could be parsed, and text is then the error.
+    """
+    if not isinstance(existing_descs, dict):
+        existing_descs = dict(enumerate(existing_descs))
+    fanout = fanout or FanOut()
+    inputs = {key: prompt.comparison_prompt(new_desc, desc) for key, desc in existing_descs.items()}
+    async for key, text in fanout.map(inputs):
+        if isinstance(text, Exception):
+            yield key, None, text
+        else:
+            yield key, prompt.parse_similarity(text), text
@@ -0,0 +1,203 @@
+import dataclasses
+import json
+import os
+import threading
+import time
+
+# USD per million tokens (input, output). Update when pricing changes.
+PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def estimate_cost(model, prompt_tokens, candidates_tokens):
+    price = PRICES.get(model)
+    if price is None:
+        return None
+    return (prompt_tokens * price[0] + candidates_tokens * price[1]) / 1_000_000
+
+
+@dataclasses.dataclass(slots=True)
+class CallMetrics:
+    model: str
+    started_at: float
+    wall_s: float
+    first_chunk_s: float | None
+    chunks: int
+    prompt_tokens: int | None
+    preamble_tokens: int | None
+    candidates_tokens: int | None
+    total_tokens: int | None
+    cost_usd: float | None
+    error: str | None = None
+    tokens_saved: int = 0
+
+
+class CallTracker:
+    """Collects timing and usage for one model call.
+
+    Feed every streamed chunk to chunk() and call finish() once the stream
+    ends (or fails). preamble_share is the fraction of the prompt taken by
+    the few-shot history; the reported prompt_tokens are split by it.
+    tokens_saved is the estimate of prompt tokens removed by budget.PromptBudget.
+    """
+
+    def __init__(self, recorder, model, preamble_share=0.0, tokens_saved=0):
+        self.recorder = recorder
+        self.model = model
+        self.preamble_share = preamble_share
+        self.tokens_saved = tokens_saved
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._first_chunk = None
+        self._chunks = 0
+        self._usage = None
+        self._finished = False
+
+    def chunk(self, chunk):
+        if self._first_chunk is None:
+            self._first_chunk = time.perf_counter() - self._start
+        self._chunks += 1
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage is not None:
+            self._usage = usage
+
+    def finish(self, error=None):
+        if self._finished or self.recorder is None:
+            return
+        self._finished = True
+        usage = self._usage
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        candidates_tokens = getattr(usage, "candidates_token_count", None)
+        total_tokens = getattr(usage, "total_token_count", None)
+        cost = None
+        if prompt_tokens is not None:
+            cost = estimate_cost(self.model, prompt_tokens, candidates_tokens or 0)
+        self.recorder.record(
+            CallMetrics(
+                model=self.model,
+                started_at=self.started_at,
+                wall_s=time.perf_counter() - self._start,
+                first_chunk_s=self._first_chunk,
+                chunks=self._chunks,
+                prompt_tokens=prompt_tokens,
+                preamble_tokens=None if prompt_tokens is None else round(prompt_tokens * self.preamble_share),
+                candidates_tokens=candidates_tokens,
+                total_tokens=total_tokens,
+                cost_usd=cost,
+                error=None if error is None else f"{type(error).__name__}: {error}",
+                tokens_saved=self.tokens_saved,
+            )
+        )
+
+
+class Recorder:
+    """Writes CallMetrics to a JSON-lines log and a Prometheus text file.
+
+    The Prometheus file is rewritten (atomically) after every call so a
+    node_exporter textfile collector always sees complete totals.
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tokens = {}
+        self._cost = {}
+        self._latency = {}
+        self._first_chunk = {}
+
+    def record(self, metrics):
+        with self._lock:
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(dataclasses.asdict(metrics)) + "\n")
+            self._aggregate(metrics)
+            if self.prometheus_path:
+                self._write_prometheus()
+
+    def _aggregate(self, metrics):
+        model = metrics.model
+        status = "error" if metrics.error else "ok"
+        self._calls[(model, status)] = self._calls.get((model, status), 0) + 1
+        for kind, count in (
+            ("prompt", metrics.prompt_tokens),
+            ("preamble", metrics.preamble_tokens),
+            ("candidates", metrics.candidates_tokens),
+            ("saved", metrics.tokens_saved),
+        ):
+            if count:
+                self._tokens[(model, kind)] = self._tokens.get((model, kind), 0) + count
+        if metrics.cost_usd:
+            self._cost[model] = self._cost.get(model, 0.0) + metrics.cost_usd
+        _observe(self._latency, model, metrics.wall_s)
+        if metrics.first_chunk_s is not None:
+            _observe(self._first_chunk, model, metrics.first_chunk_s)
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP gradease_model_calls_total Model calls by outcome.",
+            "# TYPE gradease_model_calls_total counter",
+        ]
+        for (model, status), count in sorted(self._calls.items()):
+            lines.append(f'gradease_model_calls_total{{model="{model}",status="{status}"}} {count}')
+        lines += [
+            "# HELP gradease_model_tokens_total Tokens by kind; preamble is the few-shot share of prompt,"
+            " saved the estimated prompt tokens removed before sending.",
+            "# TYPE gradease_model_tokens_total counter",
+        ]
+        for (model, kind), count in sorted(self._tokens.items()):
+            lines.append(f'gradease_model_tokens_total{{model="{model}",kind="{kind}"}} {count}')
+        lines += [
+            "# HELP gradease_model_cost_usd_total Estimated spend in USD.",
+            "# TYPE gradease_model_cost_usd_total counter",
+        ]
+        for model, cost in sorted(self._cost.items()):
+            lines.append(f'gradease_model_cost_usd_total{{model="{model}"}} {cost:.6f}')
+        for name, help_text, histograms in (
+            ("gradease_model_latency_seconds", "Wall time per model call.", self._latency),
+            ("gradease_model_first_chunk_seconds", "Time to first streamed chunk.", self._first_chunk),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for model, (buckets, total, count) in sorted(histograms.items()):
+                for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'{name}_bucket{{model="{model}",le="{bound}"}} {bucket_count}')
+                lines.append(f'{name}_bucket{{model="{model}",le="+Inf"}} {count}')
+                lines.append(f'{name}_sum{{model="{model}"}} {total:.6f}')
+                lines.append(f'{name}_count{{model="{model}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def _write_prometheus(self):
+        temporary = self.prometheus_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary, self.prometheus_path)
+
+
+def _observe(histograms, model, value):
+    buckets, total, count = histograms.get(model, ([0] * len(LATENCY_BUCKETS), 0.0, 0))
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if value <= bound:
+            buckets[index] += 1
+    histograms[model] = (buckets, total + value, count + 1)
+
+
+_recorder = None
+
+
+def configure(jsonl_path=None, prometheus_path=None):
+    """Start recording every model call; returns the Recorder."""
+    global _recorder
+    _recorder = Recorder(jsonl_path, prometheus_path) if (jsonl_path or prometheus_path) else None
+    return _recorder
+
+
+def track(model, preamble_share=0.0, tokens_saved=0):
+    """A CallTracker reporting to the configured Recorder (a no-op if none)."""
+    return CallTracker(_recorder, model, preamble_share, tokens_saved)
@@ -0,0 +1,68 @@
+# To run this code you need to install the following dependencies:
+# pip install numpy scipy
+
+import numpy as np
+from scipy import sparse
+
+from lsh import tokenize
+
+
+def document_term_matrix(descriptions):
+    """Tokenize every description once into a shared vocabulary.
+
+    Returns a binary CSR matrix (descriptions x vocabulary) and the vocabulary.
+    """
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    for description in descriptions:
+        terms = {vocabulary.setdefault(word, len(vocabulary)) for word in tokenize(description)}
+        indices.extend(sorted(terms))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.int32)
+    matrix = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(descriptions), len(vocabulary)),
+    )
+    return matrix, vocabulary
+
+
+def jaccard_matrix(descriptions):
+    """All-pairs word-set Jaccard similarity as a sparse N x N matrix.
+
+    Matches PlagiarismChecker.calculateTextSimilarity: pairs with no shared
+    word (or an empty description) are 0 and left out of the sparse result.
+    """
+    matrix, _ = document_term_matrix(descriptions)
+    intersection = (matrix @ matrix.T).tocoo()
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+    union = sizes[intersection.row] + sizes[intersection.col] - intersection.data
+    similarity = intersection.data / union
+    return sparse.csr_matrix(
+        (similarity, (intersection.row, intersection.col)),
+        shape=intersection.shape,
+    )
+
+
+def top_k_neighbours(descriptions, k=5, threshold=0.3, keys=None):
+    """Return {key: [(other_key, similarity), ...]} for every description.
+
+    Neighbours are sorted by similarity (highest first), limited to k and to
+    pairs at or above threshold, like findActualMatches on the Dart side.
+    """
+    if keys is None:
+        keys = list(range(len(descriptions)))
+    similarity = jaccard_matrix(descriptions)
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    neighbours = {}
+    for row, key in enumerate(keys):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        columns = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+        keep = scores >= threshold
+        columns, scores = columns[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")[:k]
+        neighbours[key] = [(keys[columns[i]], float(scores[i])) for i in order]
+    return neighbours
@@ -0,0 +1,362 @@
+import argparse
+import collections
+import functools
+import math
+import os
+import re
+import sys
+import tempfile
+import warnings
+from dataclasses import dataclass
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon.txt")
+_LEXICON_HEADER = "gradease-lexicon 1"
+
+# Word lists that default_lexicon() builds lexicon.txt from when it is
+# missing: the system dictionary (the "wamerican"/"words" packages) or a
+# Hunspell dictionary.
+SYSTEM_WORDLISTS = (
+    "/usr/share/dict/words",
+    "/usr/share/dict/american-english",
+    "/usr/share/dict/british-english",
+    "/usr/share/hunspell/en_US.dic",
+    "/usr/share/myspell/en_US.dic",
+    "/usr/share/myspell/dicts/en_US.dic",
+)
+
+# Words (with inner apostrophes), runs of sentence-ending punctuation, and
+# paragraph breaks, which also end a sentence (headings, bullet points).
+_TOKEN = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*|[.!?]+|\n[ \t]*\n")
+_VOWEL_GROUPS = re.compile(r"[aeiouy]+")
+_LAST_WORD = re.compile(r"\S*\s*\Z")
+
+# Suffix rewrites tried when a word is not in the lexicon as written.
+_SUFFIXES = (
+    ("'s", ""), ("’s", ""), ("ies", "y"), ("ied", "y"), ("es", ""), ("s", ""), ("ed", ""), ("ed", "e"),
+    ("ing", ""), ("ing", "e"), ("ly", ""), ("er", ""), ("est", ""),
+)
+
+MATTR_WINDOW = 50
+LONG_SENTENCE = 30
+OOV_EXAMPLES = 10
+
+
+class Lexicon:
+    """Frozen set of lowercase dictionary words.
+
+    Stored front-coded (each line is the length of the prefix shared with
+    the previous word, a tab and the rest), which roughly halves a sorted
+    word list on disk; lookups are a hash probe plus a few suffix rewrites.
+    """
+
+    def __init__(self, words):
+        self._words = frozenset(words)
+
+    @classmethod
+    def load(cls, path=LEXICON_PATH):
+        words, previous = [], ""
+        with open(path, encoding="utf-8") as file:
+            if file.readline().strip() != _LEXICON_HEADER:
+                raise ValueError(f"{path} is not a lexicon file")
+            for line in file:
+                shared, _, rest = line.rstrip("\n").partition("\t")
+                previous = previous[:int(shared)] + rest
+                words.append(previous)
+        return cls(words)
+
+    @staticmethod
+    def normalize(words):
+        """Sorted lowercase words from a word list (Hunspell "word/FLAGS" and its count line are accepted)."""
+        words = {word.split("/", 1)[0].strip().lower() for word in words}
+        return sorted(word for word in words if word and not word.isdigit())
+
+    @staticmethod
+    def build(words, path=LEXICON_PATH):
+        """Write a lexicon from an iterable of words; returns the word count.
+
+        The file is written under a temporary name and renamed into place,
+        so a concurrent load() never sees it half written.
+        """
+        words = Lexicon.normalize(words)
+        previous = ""
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with open(descriptor, "w", encoding="utf-8") as file:
+                file.write(_LEXICON_HEADER + "\n")
+                for word in words:
+                    shared = len(os.path.commonprefix((previous, word)))
+                    file.write(f"{shared}\t{word[shared:]}\n")
+                    previous = word
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return len(words)
+
+    def __contains__(self, word):
+        word = word.lower()
+        if word in self._words:
+            return True
+        for suffix, replacement in _SUFFIXES:
+            if word.endswith(suffix) and len(word) > len(suffix) + 2:
+                if word[:-len(suffix)] + replacement in self._words:
+                    return True
+        return False
+
+    def __len__(self):
+        return len(self._words)
+
+
+def read_wordlists(paths):
+    for path in paths:
+        with open(path, encoding="utf-8", errors="ignore") as file:
+            yield from file
+
+
+@functools.lru_cache(maxsize=None)
+def default_lexicon():
+    """The lexicon next to this file, built from SYSTEM_WORDLISTS on first use.
+
+    Returns None (Spelling is then left to the model) when neither exists;
+    `lexical.py build-lexicon <word lists>` builds it from other lists.
+    """
+    if os.path.exists(LEXICON_PATH):
+        return Lexicon.load(LEXICON_PATH)
+    wordlists = [path for path in SYSTEM_WORDLISTS if os.path.exists(path)]
+    if not wordlists:
+        warnings.warn(
+            f"no lexicon at {LEXICON_PATH} and no system word list; Spelling is not measured"
+            " (run `lexical.py build-lexicon <word lists>`)",
+            stacklevel=2,
+        )
+        return None
+    words = Lexicon.normalize(read_wordlists(wordlists))
+    try:
+        Lexicon.build(words, LEXICON_PATH)
+    except OSError:
+        # A read-only install: use the words for this process only.
+        pass
+    return Lexicon(words)
+
+
+def syllables(word):
+    word = word.lower()
+    count = len(_VOWEL_GROUPS.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee")) and count > 1:
+        count -= 1
+    return max(1, count)
+
+
+@dataclass(slots=True, frozen=True)
+class LexicalStats:
+    words: int
+    types: int
+    type_token_ratio: float
+    mattr: float
+    oov_rate: float | None
+    oov_examples: tuple
+    sentences: int
+    mean_sentence_length: float
+    median_sentence_length: float
+    p90_sentence_length: float
+    long_sentence_share: float
+    flesch_reading_ease: float
+    flesch_kincaid_grade: float
+    gunning_fog: float
+
+
+class LexicalAnalyzer:
+    """One streaming pass over a document's text.
+
+    feed() may be called with arbitrary pieces of the text (a word split
+    across two pieces is joined again); finish() returns LexicalStats.
+    Capitalized words inside a sentence, all-caps acronyms and mixed-case
+    names (GradEase, iOS) are not checked against the lexicon.
+    """
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon
+        self._tail = ""
+        self._words = 0
+        self._types = set()
+        self._window = collections.deque()
+        self._window_counts = collections.Counter()
+        self._window_ratios = 0.0
+        self._windows = 0
+        self._checked = 0
+        self._oov = collections.Counter()
+        self._sentence = 0
+        self._sentence_lengths = []
+        self._syllables = 0
+        self._complex = 0
+
+    def feed(self, text):
+        text = self._tail + text
+        # Hold back the last word and trailing whitespace: the next piece may
+        # continue the word or complete a paragraph break.
+        cut = _LAST_WORD.search(text).start()
+        self._tail = text[cut:]
+        self._scan(text[:cut])
+
+    def _scan(self, text):
+        for match in _TOKEN.finditer(text):
+            token = match.group()
+            if not token[0].isalpha():
+                self._end_sentence()
+                continue
+            self._word(token)
+
+    def _word(self, token):
+        word = token.lower()
+        # Lowercase words, or a capital only because the sentence starts there.
+        checkable = token.islower() or (self._sentence == 0 and token[1:].islower())
+        if self.lexicon is not None and len(token) > 1 and checkable:
+            self._checked += 1
+            if word not in self.lexicon:
+                self._oov[word] += 1
+        self._sentence += 1
+        self._words += 1
+        self._types.add(word)
+        self._window.append(word)
+        self._window_counts[word] += 1
+        if len(self._window) > MATTR_WINDOW:
+            old = self._window.popleft()
+            self._window_counts[old] -= 1
+            if not self._window_counts[old]:
+                del self._window_counts[old]
+        if len(self._window) == MATTR_WINDOW:
+            self._window_ratios += len(self._window_counts) / MATTR_WINDOW
+            self._windows += 1
+        count = syllables(word)
+        self._syllables += count
+        self._complex += count >= 3
+
+    def _end_sentence(self):
+        if self._sentence:
+            self._sentence_lengths.append(self._sentence)
+            self._sentence = 0
+
+    def finish(self):
+        self._scan(self._tail)
+        self._tail = ""
+        self._end_sentence()
+        words = self._words
+        lengths = sorted(self._sentence_lengths)
+        sentences = len(lengths)
+        ttr = len(self._types) / words if words else 0.0
+        words_per_sentence = words / sentences if sentences else 0.0
+        syllables_per_word = self._syllables / words if words else 0.0
+        complex_share = self._complex / words if words else 0.0
+        oov_rate = None
+        if self.lexicon is not None:
+            oov_rate = sum(self._oov.values()) / self._checked if self._checked else 0.0
+        return LexicalStats(
+            words=words,
+            types=len(self._types),
+            type_token_ratio=ttr,
+            mattr=self._window_ratios / self._windows if self._windows else ttr,
+            oov_rate=oov_rate,
+            oov_examples=tuple(word for word, _ in self._oov.most_common(OOV_EXAMPLES)),
+            sentences=sentences,
+            mean_sentence_length=words_per_sentence,
+            median_sentence_length=_percentile(lengths, 0.5),
+            p90_sentence_length=_percentile(lengths, 0.9),
+            long_sentence_share=sum(length > LONG_SENTENCE for length in lengths) / sentences if sentences else 0.0,
+            flesch_reading_ease=206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word if words else 0.0,
+            flesch_kincaid_grade=0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59 if words else 0.0,
+            gunning_fog=0.4 * (words_per_sentence + 100 * complex_share),
+        )
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    return float(values[min(len(values) - 1, math.ceil(fraction * len(values)) - 1)])
+
+
+def analyze(pieces, lexicon=None):
+    """LexicalStats for an iterable of text pieces (paragraphs, chunks).
+
+    lexicon defaults to default_lexicon(); without one oov_rate is None.
+    """
+    analyzer = LexicalAnalyzer(lexicon if lexicon is not None else default_lexicon())
+    for piece in pieces:
+        analyzer.feed(piece)
+    return analyzer.finish()
+
+
+def _clamp(value):
+    return float(round(min(100.0, max(0.0, value))))
+
+
+def rubric_scores(stats):
+    """{criterion: percentage} for the criteria decided from statistics alone.
+
+    Spelling loses 10 points per percent of out-of-lexicon words beyond a 1%
+    allowance for technical terms (only with a lexicon). Vocabulary maps a
+    moving-average type/token ratio of 0.72 (typical report prose) to 70%,
+    10 points per 0.1, on the same scale as the few-shot answers.
+    """
+    scores = {}
+    if stats.words == 0:
+        return scores
+    if stats.oov_rate is not None:
+        scores["Spelling"] = _clamp(100 - 10 * max(0.0, 100 * stats.oov_rate - 1))
+    scores["Vocabulary"] = _clamp(70 + 100 * (stats.mattr - 0.72))
+    return scores
+
+
+def facts(stats, scores=None):
+    """The measured statistics as a block of given facts for the prompt."""
+    scores = rubric_scores(stats) if scores is None else scores
+    lines = ["Measured locally (exact; do not re-estimate these):"]
+    if "Spelling" in scores:
+        examples = ", ".join(f'"{word}"' for word in stats.oov_examples[:5])
+        lines.append(
+            f"Spelling: {scores['Spelling']:.0f}% ({100 * stats.oov_rate:.1f}% of {stats.words:,} words not in"
+            f" the dictionary{', e.g. ' + examples if examples else ''})"
+        )
+    if "Vocabulary" in scores:
+        lines.append(f"Vocabulary: {scores['Vocabulary']:.0f}% (moving-average type/token ratio {stats.mattr:.2f})")
+    lines.append(
+        f"Sentences: {stats.sentences:,}, mean {stats.mean_sentence_length:.1f} words, median"
+        f" {stats.median_sentence_length:.0f}, 90th percentile {stats.p90_sentence_length:.0f},"
+        f" {100 * stats.long_sentence_share:.0f}% over {LONG_SENTENCE} words"
+    )
+    lines.append(
+        f"Readability: Flesch reading ease {stats.flesch_reading_ease:.1f}, Flesch-Kincaid grade"
+        f" {stats.flesch_kincaid_grade:.1f}, Gunning fog {stats.gunning_fog:.1f}"
+    )
+    given = " and ".join(scores)
+    if given:
+        lines.append(
+            f"Use the given {given} percentages as they are and judge the other criteria from the text,"
+            " using the sentence and readability figures for Grammar and Clarity."
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the lexicon or print lexical statistics for a document.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-lexicon", help="build lexicon.txt from word lists (one word per line)")
+    build.add_argument("wordlists", nargs="*", help="default: the system word lists found (SYSTEM_WORDLISTS)")
+    build.add_argument("-o", "--output", default=LEXICON_PATH)
+    stats = commands.add_parser("stats", help="print the given facts for a document (PDF, DOCX or text)")
+    stats.add_argument("document")
+    args = parser.parse_args(argv)
+
+    if args.command == "build-lexicon":
+        wordlists = args.wordlists or [path for path in SYSTEM_WORDLISTS if os.path.exists(path)]
+        if not wordlists:
+            parser.error("no system word list found; pass word list files")
+        print(f"{Lexicon.build(read_wordlists(wordlists), args.output):,} words")
+        return
+    import documents
+
+    print(facts(analyze(text + "\n\n" for text, _ in documents.iter_paragraphs(args.document))))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import hashlib
+import random
+import re
+
+# Same tokenization as PlagiarismChecker.calculateTextSimilarity: lowercase,
+# split on non-word characters (Dart's \W is ASCII-only).
+_WORD_SPLIT = re.compile(r"\W+", re.ASCII)
+
+# Function words dropped before shingling for MinHash: they make unrelated
+# descriptions look 10-15% similar and carry no idea of their own.
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does each for from
+had has have having he her here him his how i if in into is it its itself just may me more most my no nor not of
+off on once only or other our ours out over own same she should so some such than that the their theirs them
+then there these they this those through to too under until up us very was we were what when where which while
+who whom why will with would you your
+""".split())
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def tokenize(text):
+    return [word for word in _WORD_SPLIT.split(text.lower()) if word]
+
+
+def jaccard_similarity(text1, text2):
+    """Word-set Jaccard similarity, as PlagiarismChecker.calculateTextSimilarity."""
+    words1, words2 = set(tokenize(text1)), set(tokenize(text2))
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def content_words(text, stopwords=STOPWORDS):
+    """tokenize(text) without stopwords."""
+    return [word for word in tokenize(text) if word not in stopwords]
+
+
+def content_jaccard(text1, text2):
+    """Jaccard similarity of the word sets without stopwords."""
+    words1, words2 = set(content_words(text1)), set(content_words(text2))
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def shingles(text, size=1, stopwords=()):
+    words = content_words(text, stopwords) if stopwords else tokenize(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash_shingle(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def collision_probability(similarity, bands, rows):
+    """Chance that two texts at this Jaccard similarity share a band bucket."""
+    return 1.0 - (1.0 - similarity ** rows) ** bands
+
+
+def _choose_bands(num_perm, threshold, recall):
+    """Pick the most selective (bands, rows) that still catches `recall` of
+    the pairs at the threshold.
+
+    A missed pair is scored 0% without a model call, so the S-curve has to
+    be well past its midpoint at the threshold, not centred on it.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if collision_probability(threshold, bands, rows) >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+def signature_similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if signature is None or other is None:
+        return 0.0
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+class MinHashLSH:
+    """Banded MinHash index over group descriptions.
+
+    Signatures are taken over `shingle_size`-word shingles of the text
+    without stopwords. Descriptions whose shingle Jaccard similarity is
+    `threshold` or higher share at least one band bucket with probability
+    `recall` or more; everything else can be scored 0% without a model
+    call. Unrelated few-shot descriptions are at most 0.03 apart in
+    stopword-free word pairs (0.07-0.18 in plain words), while a copy with a
+    quarter of its words changed is still around 0.35.
+    """
+
+    def __init__(self, threshold=0.2, num_perm=256, shingle_size=2, seed=1, recall=0.99, stopwords=STOPWORDS):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.stopwords = stopwords
+        self.bands, self.rows = _choose_bands(num_perm, threshold, recall)
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+
+    def signature(self, text):
+        hashes = [_hash_shingle(s) for s in shingles(text, self.shingle_size, self.stopwords)]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start:start + self.rows]
+
+    def add(self, key, text):
+        self.add_signature(key, self.signature(text))
+
+    def add_signature(self, key, signature):
+        """Index a precomputed signature (e.g. from preprocess.preprocess)."""
+        if key in self._signatures:
+            self.remove(key)
+        self._signatures[key] = signature
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def query(self, text, exclude=None):
+        """Return keys of indexed descriptions that collide with text."""
+        signature = self.signature(text)
+        if signature is None:
+            return set()
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        candidates.discard(exclude)
+        return candidates
+
+    def estimate_similarity(self, text, key):
+        return signature_similarity(self.signature(text), self._signatures.get(key))
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def __len__(self):
+        return len(self._signatures)
@@ -0,0 +1,181 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import lsh
+import prompt
+
+PairScore = namedtuple("PairScore", ["group_a", "group_b", "local_score", "model_score", "model_version"])
+
+
+def description_hash(description):
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+def _ordered(group_a, group_b):
+    return (group_a, group_b) if group_a <= group_b else (group_b, group_a)
+
+
+class PairStore:
+    """Persistent group x group similarity scores for a whole cohort.
+
+    Every pair is stored once (group_a < group_b) with its local Jaccard
+    score, the model score (if one was requested), the model version and
+    the hashes of both descriptions it was computed from. Registering a
+    group computes only its own row; changing a description drops only that
+    group's row and column.
+    """
+
+    def __init__(self, path="pair_scores.sqlite3"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS groups (
+                group_id TEXT PRIMARY KEY,
+                description_hash TEXT NOT NULL,
+                description TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pairs (
+                group_a TEXT NOT NULL,
+                group_b TEXT NOT NULL,
+                local_score REAL NOT NULL,
+                model_score REAL,
+                model_version TEXT,
+                hash_a TEXT NOT NULL,
+                hash_b TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (group_a, group_b)
+            );
+            CREATE INDEX IF NOT EXISTS pairs_group_b ON pairs (group_b);
+            """
+        )
+        self._db.commit()
+
+    def _groups(self):
+        return {
+            group_id: (digest, description)
+            for group_id, digest, description in self._db.execute(
+                "SELECT group_id, description_hash, description FROM groups"
+            )
+        }
+
+    def register(self, group_id, description, model_score=None, model_candidates=None, model_version=None):
+        """Add or update a group and compute its row of pair scores.
+
+        model_score(description_1, description_2) is called for the groups in
+        model_candidates (all other groups when None); the rest only get a
+        local score. The group and its row are written in one transaction
+        once every pair is scored, so a failing model_score leaves nothing
+        behind; groups registered or changed meanwhile are scored before
+        writing. Returns the number of pairs written, which is 0 when the
+        description has not changed and its row is complete.
+        """
+        digest = description_hash(description)
+        model_version = model_version or prompt.MODEL
+        with self._lock:
+            groups = self._groups()
+            if group_id in groups and groups[group_id][0] == digest and self._complete(group_id, digest, groups):
+                return 0
+
+        rows = {}
+        while True:
+            for other_id, (other_digest, other_description) in groups.items():
+                if other_id == group_id or rows.get(other_id, (None,))[0] == other_digest:
+                    continue
+                model = None
+                if model_score is not None and (model_candidates is None or other_id in model_candidates):
+                    model = model_score(description, other_description)
+                group_a, group_b = _ordered(group_id, other_id)
+                hash_a, hash_b = (digest, other_digest) if group_a == group_id else (other_digest, digest)
+                rows[other_id] = (other_digest, (
+                    group_a,
+                    group_b,
+                    lsh.jaccard_similarity(description, other_description),
+                    model,
+                    model_version if model is not None else None,
+                    hash_a,
+                    hash_b,
+                    time.time(),
+                ))
+            with self._lock:
+                groups = self._groups()
+                current = {other_id: value[0] for other_id, value in groups.items() if other_id != group_id}
+                if any(rows.get(other_id, (None,))[0] != other_digest for other_id, other_digest in current.items()):
+                    continue
+                self._invalidate(group_id)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO groups (group_id, description_hash, description) VALUES (?, ?, ?)",
+                    (group_id, digest, description),
+                )
+                written = [row for other_id, (_, row) in rows.items() if other_id in current]
+                self._db.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", written)
+                self._db.commit()
+            return len(written)
+
+    def _complete(self, group_id, digest, groups):
+        """Whether group_id has a pair with every other group at their current hashes."""
+        stored = {}
+        for group_a, group_b, hash_a, hash_b in self._db.execute(
+            "SELECT group_a, group_b, hash_a, hash_b FROM pairs WHERE group_a = ? OR group_b = ?", (group_id, group_id)
+        ):
+            other_id, own, other = (group_b, hash_a, hash_b) if group_a == group_id else (group_a, hash_b, hash_a)
+            if own == digest:
+                stored[other_id] = other
+        return stored == {other_id: value[0] for other_id, value in groups.items() if other_id != group_id}
+
+    def _invalidate(self, group_id):
+        self._db.execute("DELETE FROM pairs WHERE group_a = ? OR group_b = ?", (group_id, group_id))
+
+    def invalidate(self, group_id):
+        """Drop every stored score involving group_id."""
+        with self._lock:
+            self._invalidate(group_id)
+            self._db.commit()
+
+    def remove(self, group_id):
+        with self._lock:
+            self._invalidate(group_id)
+            self._db.execute("DELETE FROM groups WHERE group_id = ?", (group_id,))
+            self._db.commit()
+
+    def set_model_score(self, group_a, group_b, score, model_version=None):
+        group_a, group_b = _ordered(group_a, group_b)
+        with self._lock:
+            self._db.execute(
+                "UPDATE pairs SET model_score = ?, model_version = ?, updated = ? WHERE group_a = ? AND group_b = ?",
+                (score, model_version or prompt.MODEL, time.time(), group_a, group_b),
+            )
+            self._db.commit()
+
+    def scores(self, group_id):
+        """{other_group_id: PairScore} for every stored pair with group_id."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT group_a, group_b, local_score, model_score, model_version FROM pairs"
+                " WHERE group_a = ? OR group_b = ?",
+                (group_id, group_id),
+            ).fetchall()
+        return {(row[1] if row[0] == group_id else row[0]): PairScore(*row) for row in rows}
+
+    def report(self, local_threshold=0.0, model_threshold=None):
+        """Yield stored pairs at or above the thresholds, highest first.
+
+        Pairs are ranked by model score, or by local score as a percentage
+        when no model score is stored. A pair qualifies when its local score
+        reaches local_threshold or its model score reaches model_threshold.
+        """
+        query = (
+            "SELECT group_a, group_b, local_score, model_score, model_version FROM pairs"
+            " WHERE local_score >= ? OR (? IS NOT NULL AND model_score >= ?)"
+            " ORDER BY COALESCE(model_score, local_score * 100) DESC"
+        )
+        with self._lock:
+            rows = self._db.execute(query, (local_threshold, model_threshold, model_threshold)).fetchall()
+        for row in rows:
+            yield PairScore(*row)
+
+    def close(self):
+        self._db.close()
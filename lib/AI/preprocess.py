@@ -0,0 +1,161 @@
+# To run this code you need to install the following dependencies:
+# pip install numpy
+
+import concurrent.futures
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import lsh
+
+# List markers from Word/PDF exports: bullets, Symbol-font private-use
+# glyphs, and the "o" Word uses for second-level bullets.
+_BULLET = re.compile("^[ \t]*(?:[\u2022\u25e6\u25aa\u25ab\u25cf\u25cb\u25a0\u25a1\uf0b7\uf0a7\u2023\u2043\u2219\u00b7]|o(?=\t| {2,}))[ \t]*", re.M)
+_SPACES = re.compile("[ \t\u00a0\u2000-\u200b]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u201e": '"', "\u2018": "'", "\u2019": "'", "\u2013": "-", "\u2014": "-"})
+
+BOILERPLATE = (
+    re.compile(r"^\s*page\s+\d+(\s+of\s+\d+)?\s*$", re.I | re.M),
+    re.compile(r"^\s*\d{1,4}\s*$", re.M),
+    re.compile(r"^.*\.{4,}\s*\d+\s*$", re.M),
+    re.compile(r"^\s*(table of contents|list of (figures|tables))\s*$", re.I | re.M),
+)
+
+
+def normalize(text):
+    """Unicode cleanup: NFKC, plain quotes and dashes, bullets to "- "."""
+    text = unicodedata.normalize("NFKC", text).translate(_QUOTES)
+    text = _BULLET.sub("- ", text)
+    text = _SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def strip_boilerplate(text, patterns=BOILERPLATE):
+    for pattern in patterns:
+        text = pattern.sub("", text)
+    return text
+
+
+def _read(item):
+    """An item is raw text, or a path to a PDF/DOCX/text file."""
+    if isinstance(item, str) and "\n" not in item and len(item) < 4096 and os.path.isfile(item):
+        import documents
+
+        return "\n\n".join(text for text, _ in documents.iter_paragraphs(item))
+    return item
+
+
+_minhash = None
+
+
+def _process_chunk(start, items, out_path, shm_name, rows, num_perm, shingle_size):
+    """Worker: clean a slice of the corpus and write results in place.
+
+    Signatures and token counts go straight into the shared-memory arrays;
+    normalized texts are appended to this chunk's own file. Only the byte
+    offsets travel back to the parent.
+    """
+    global _minhash
+    if _minhash is None or _minhash.num_perm != num_perm or _minhash.shingle_size != shingle_size:
+        _minhash = lsh.MinHashLSH(num_perm=num_perm, shingle_size=shingle_size)
+    memory = shared_memory.SharedMemory(name=shm_name)
+    try:
+        signatures = np.ndarray((rows, num_perm), dtype=np.uint32, buffer=memory.buf)
+        counts = np.ndarray((rows,), dtype=np.int64, buffer=memory.buf, offset=signatures.nbytes)
+        offsets = [0]
+        with open(out_path, "wb") as out:
+            for row, item in enumerate(items, start=start):
+                text = normalize(strip_boilerplate(_read(item)))
+                signature = _minhash.signature(text)
+                if signature is not None:
+                    signatures[row] = signature
+                counts[row] = len(lsh.tokenize(text))
+                offsets.append(offsets[-1] + out.write(text.encode("utf-8")))
+        del signatures, counts
+    finally:
+        memory.close()
+    return start, out_path, offsets
+
+
+class Corpus:
+    """Preprocessed documents backed by memory-mapped text files.
+
+    signatures (N x num_perm uint32) and token_counts (N) are numpy arrays;
+    text(i) decodes one normalized document from its memory-mapped chunk.
+    Rows with token_counts == 0 have no signature.
+    """
+
+    def __init__(self, directory, signatures, token_counts, spans):
+        self.directory = directory
+        self.signatures = signatures
+        self.token_counts = token_counts
+        self._spans = spans
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.token_counts)
+
+    def text(self, index):
+        path, begin, end = self._spans[index]
+        if path not in self._maps:
+            # np.memmap refuses empty files (a chunk of empty documents).
+            empty = not os.path.getsize(path)
+            self._maps[path] = np.zeros(0, np.uint8) if empty else np.memmap(path, dtype=np.uint8, mode="r")
+        return self._maps[path][begin:end].tobytes().decode("utf-8")
+
+    def signature(self, index):
+        if not self.token_counts[index]:
+            return None
+        return tuple(int(value) for value in self.signatures[index])
+
+    def close(self):
+        self._maps.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def preprocess(items, workers=None, chunksize=16, num_perm=256, shingle_size=2, directory=None):
+    """Normalize, strip, tokenize and shingle items on a process pool.
+
+    items are texts or file paths. Work is handed out in chunks of
+    `chunksize` items; results come back through shared memory and
+    memory-mapped files rather than pickled copies. Signatures match
+    lsh.MinHashLSH(num_perm, shingle_size), so they can be indexed with
+    MinHashLSH.add_signature.
+    """
+    items = list(items)
+    rows = len(items)
+    directory = directory or tempfile.mkdtemp(prefix="gradease-preprocess-")
+    signature_bytes = rows * num_perm * np.dtype(np.uint32).itemsize
+    memory = shared_memory.SharedMemory(create=True, size=max(1, signature_bytes + rows * 8))
+    try:
+        spans = [None] * rows
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _process_chunk,
+                    start,
+                    items[start:start + chunksize],
+                    os.path.join(directory, f"chunk-{start}.txt"),
+                    memory.name,
+                    rows,
+                    num_perm,
+                    shingle_size,
+                )
+                for start in range(0, rows, chunksize)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                start, path, offsets = future.result()
+                for row, (begin, end) in enumerate(zip(offsets, offsets[1:]), start=start):
+                    spans[row] = (path, begin, end)
+        signatures = np.ndarray((rows, num_perm), dtype=np.uint32, buffer=memory.buf).copy()
+        token_counts = np.ndarray((rows,), dtype=np.int64, buffer=memory.buf, offset=signature_bytes).copy()
+    finally:
+        memory.close()
+        memory.unlink()
+    return Corpus(directory, signatures, token_counts, spans)
@@ -0,0 +1,155 @@
+import dataclasses
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import lsh
+import prompt
+import structured
+
+Reevaluation = namedtuple("Reevaluation", ["evaluation", "reused", "changed"])
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def split_sections(text):
+    """Paragraph-level sections of a group description or document text."""
+    return [section.strip() for section in _PARAGRAPH_BREAK.split(text) if section.strip()]
+
+
+class ReevaluationGate:
+    """Change detection in front of the rubric evaluation call.
+
+    The last evaluated text of every group is kept with its rubric result,
+    a MinHash signature of the whole text and one per section. When a group
+    is saved again the previous result is returned as-is only if
+
+    * the whole text changed by less than `threshold` (1 - estimated
+      Jaccard of word shingles),
+    * the sections without a close match among the previous sections make
+      up less than `threshold` of the text's tokens, and
+    * the previous sections without a close match now (deleted ones) make
+      up less than `threshold` of the previous text's tokens;
+
+    otherwise the whole text is evaluated again in one call. The rubric
+    judges the text as a whole, so per-section results are not merged.
+    """
+
+    def __init__(self, path="reevaluations.sqlite3", threshold=0.1, shingle_size=3, evaluate=None):
+        self.threshold = threshold
+        self.evaluate = evaluate or structured.evaluate
+        self._minhash = lsh.MinHashLSH(shingle_size=shingle_size)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS evaluations (
+                group_id TEXT PRIMARY KEY,
+                signature TEXT,
+                evaluation TEXT NOT NULL,
+                sections TEXT NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def _signature(self, text):
+        return self._minhash.signature(text)
+
+    def _load(self, group_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT signature, evaluation, sections FROM evaluations WHERE group_id = ?", (group_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        signature = tuple(json.loads(row[0])) if row[0] else None
+        sections = [
+            (section["hash"], tuple(section["signature"]) if section["signature"] else None, section["tokens"])
+            for section in json.loads(row[2])
+        ]
+        return signature, structured.Evaluation(**json.loads(row[1])), sections
+
+    def _save(self, group_id, signature, evaluation, sections):
+        payload = json.dumps([
+            {"hash": digest, "signature": section_signature, "tokens": tokens}
+            for digest, section_signature, tokens in sections
+        ])
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?)",
+                (group_id, json.dumps(signature), json.dumps(dataclasses.asdict(evaluation)), payload, time.time()),
+            )
+            self._db.commit()
+
+    def change(self, group_id, text):
+        """Fraction of the text that changed since the last evaluation (1.0 if none)."""
+        previous = self._load(group_id)
+        if previous is None:
+            return 1.0
+        return 1.0 - lsh.signature_similarity(self._signature(text), previous[0])
+
+    def _sections(self, text):
+        return [
+            (
+                hashlib.sha256(section.encode("utf-8")).hexdigest(),
+                self._signature(section),
+                prompt.estimate_tokens(section),
+            )
+            for section in split_sections(text)
+        ]
+
+    def evaluate_group(self, group_id, text):
+        """Return a Reevaluation for the group's current text.
+
+        `changed` is the largest of the whole-text change, the share of the
+        text (by tokens) in sections with no close previous match and the
+        share of the previous text with no close match now (deleted
+        sections); 1.0 for a group not evaluated before.
+        """
+        signature = self._signature(text)
+        sections = self._sections(text)
+        if not sections:
+            raise ValueError(f"group {group_id!r} has no text to evaluate")
+        previous = self._load(group_id)
+        changed = 1.0
+        if previous is not None:
+            previous_signature, previous_evaluation, previous_sections = previous
+            changed = max(
+                1.0 - lsh.signature_similarity(signature, previous_signature),
+                self._unmatched_share(sections, previous_sections),
+                self._unmatched_share(previous_sections, sections),
+            )
+            if changed < self.threshold:
+                return Reevaluation(previous_evaluation, True, changed)
+
+        evaluation = self.evaluate(text)
+        self._save(group_id, signature, evaluation, sections)
+        return Reevaluation(evaluation, False, changed)
+
+    def _unmatched_share(self, sections, other_sections):
+        """Share of the tokens of sections in those with no close match among other_sections."""
+        unmatched = sum(
+            tokens for digest, signature, tokens in sections
+            if not self._matches(digest, signature, other_sections)
+        )
+        return unmatched / max(1, sum(tokens for _, _, tokens in sections))
+
+    def _matches(self, digest, signature, previous_sections):
+        for previous_digest, previous_signature, _ in previous_sections:
+            if previous_digest == digest:
+                return True
+            if lsh.signature_similarity(signature, previous_signature) >= 1.0 - self.threshold:
+                return True
+        return False
+
+    def forget(self, group_id):
+        with self._lock:
+            self._db.execute("DELETE FROM evaluations WHERE group_id = ?", (group_id,))
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
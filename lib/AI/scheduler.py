@@ -0,0 +1,237 @@
+import asyncio
+import collections
+import contextlib
+import statistics
+import time
+
+# Priority classes, most urgent first.
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+PRIORITIES = {"interactive": INTERACTIVE, "normal": NORMAL, "bulk": BULK}
+
+# RESOURCE_EXHAUSTED and UNAVAILABLE: the API is telling us to back off.
+OVERLOAD_CODES = {429, 503}
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before it could run (or finish)."""
+
+
+class AIMDLimit:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+
+    The limit grows by `increase` per window of `limit` successful calls and
+    is multiplied by `decrease` on an overload error or when latency stays
+    inflated. Only calls started after the last decrease can trigger another
+    one, so a burst of 429s from the same window halves the limit once, not
+    N times.
+
+    Latency is tracked per route (the priority class, unless the caller
+    names one), because a long evaluation and a short comparison have very
+    different normal latencies. Each route's samples are taken in windows of
+    `window`; the median of a window is compared with the route's baseline,
+    so a minority of slow requests does not count as inflation. The limit
+    shrinks after `patience` consecutive windows above `latency_tolerance`
+    times the baseline. The baseline follows lower medians at once and
+    drifts up by `baseline_decay` of the gap per window, so an old best
+    case does not keep the limit down forever.
+    """
+
+    def __init__(
+        self,
+        initial=8,
+        minimum=2,
+        maximum=64,
+        increase=1.0,
+        decrease=0.5,
+        latency_tolerance=2.0,
+        window=10,
+        patience=2,
+        baseline_decay=0.1,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.window = window
+        self.patience = patience
+        self.baseline_decay = baseline_decay
+        self._samples = collections.defaultdict(list)
+        self.baseline = {}
+        self._inflated = collections.Counter()
+        self._last_decrease = float("-inf")
+
+    def on_success(self, started, latency, route=None):
+        if self.latency_tolerance and self._latency_inflated(route, latency):
+            self.on_overload(started)
+        else:
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def _latency_inflated(self, route, latency):
+        """Record a latency; True when route's latency has stayed inflated for `patience` windows."""
+        samples = self._samples[route]
+        samples.append(latency)
+        if len(samples) < self.window:
+            return False
+        median = statistics.median(samples)
+        samples.clear()
+        baseline = self.baseline.get(route)
+        if baseline is None or median <= baseline:
+            self.baseline[route] = median
+            self._inflated[route] = 0
+            return False
+        self.baseline[route] = baseline + self.baseline_decay * (median - baseline)
+        if median <= self.latency_tolerance * baseline:
+            self._inflated[route] = 0
+            return False
+        self._inflated[route] += 1
+        if self._inflated[route] < self.patience:
+            return False
+        self._inflated[route] = 0
+        return True
+
+    def on_overload(self, started):
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self._last_decrease = time.monotonic()
+
+
+class Slot:
+    """A granted unit of concurrency; see Scheduler.slot."""
+
+    def __init__(self, priority, tenant, deadline):
+        self.priority = priority
+        self.tenant = tenant
+        self.deadline = deadline
+        self.started = None
+        self.latency = None
+
+    def remaining(self):
+        """Seconds left until the deadline (None when there is none)."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def first_chunk(self):
+        """Mark the first streamed chunk; its latency feeds the AIMD limit."""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+
+class Scheduler:
+    """Priority and fair-share admission in front of the model calls.
+
+    Waiting requests are served strictly by priority class and, within a
+    class, round-robin across tenants (a supervisor or a group), FIFO within
+    a tenant, so one supervisor's bulk re-evaluation cannot starve another's
+    or any student's interactive check. `reserve` is the share of the
+    current limit, and at least one slot, that only INTERACTIVE requests
+    may use, so they rarely queue behind bulk work that is already running.
+    A request that is still queued at its deadline fails with
+    DeadlineExceeded.
+    """
+
+    def __init__(self, limit=None, reserve=0.25):
+        self.limit = limit or AIMDLimit()
+        self.reserve = reserve
+        if reserve and self.limit.minimum < 2:
+            raise ValueError("a reserve needs a minimum limit of at least 2")
+        self.in_flight = 0
+        self._queues = {}
+
+    @property
+    def queued(self):
+        return sum(
+            not future.done() for queue in self._queues.values() for entries in queue.values() for future in entries
+        )
+
+    def _capacity(self, priority):
+        limit = int(self.limit.limit)
+        if priority == INTERACTIVE:
+            return limit
+        if not self.reserve:
+            return limit
+        return max(0, limit - max(1, round(limit * self.reserve)))
+
+    def _pop(self, queue):
+        while queue:
+            tenant, entries = next(iter(queue.items()))
+            future = entries.popleft()
+            if entries:
+                queue.move_to_end(tenant)
+            else:
+                del queue[tenant]
+            if not future.done():
+                return future
+        return None
+
+    def _dispatch(self):
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue and self.in_flight < self._capacity(priority):
+                future = self._pop(queue)
+                if future is None:
+                    break
+                self.in_flight += 1
+                future.set_result(None)
+            if queue:
+                # Lower classes never overtake a waiting higher class.
+                break
+
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    async def _acquire(self, priority, tenant, deadline):
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(priority, collections.OrderedDict())
+        queue.setdefault(tenant, collections.deque()).append(future)
+        self._dispatch()
+        if future.done():
+            return
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"queued past its deadline (priority {priority}, tenant {tenant!r})")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority=NORMAL, tenant=None, timeout=None, route=None):
+        """Wait for a slot and hold it for the body of the `async with`.
+
+        An exception with an OVERLOAD_CODES `code` shrinks the limit; success
+        grows it, using the time to Slot.first_chunk() (or to the end of the
+        block) as the latency signal for `route` (default: the priority).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        await self._acquire(priority, tenant, deadline)
+        slot = Slot(priority, tenant, deadline)
+        slot.started = time.monotonic()
+        try:
+            yield slot
+        except Exception as error:
+            if getattr(error, "code", None) in OVERLOAD_CODES:
+                self.limit.on_overload(slot.started)
+            raise
+        else:
+            slot.first_chunk()
+            self.limit.on_success(slot.started, slot.latency, priority if route is None else route)
+        finally:
+            self._release()
+
+    async def run(self, function, *args, priority=NORMAL, tenant=None, timeout=None, **kwargs):
+        """Await function(*args, **kwargs) in a slot, within the deadline."""
+        async with self.slot(priority, tenant, timeout) as slot:
+            remaining = slot.remaining()
+            if remaining is None:
+                return await function(*args, **kwargs)
+            try:
+                return await asyncio.wait_for(function(*args, **kwargs), max(0.0, remaining))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("deadline passed while running") from None
@@ -0,0 +1,236 @@
+import asyncio
+import contextlib
+import json
+
+import coalesce
+import instrumentation
+import prompt
+import scheduler as scheduling
+import stream_parser
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class EvaluationService:
+    """Small asyncio HTTP service in front of the model.
+
+    One client (and so one pooled HTTP connection to the API) and one copy of
+    the few-shot history are shared by every request.
+
+    POST /evaluate  {"text": ...}
+    POST /compare   {"description_1": ..., "description_2": ...}
+
+    With "stream": true in the body the raw model text is sent back with
+    chunked transfer encoding as it arrives; otherwise a JSON object with the
+    parsed scores and the full response is returned.
+
+    Model calls go through a scheduler.Scheduler. Requests are INTERACTIVE
+    unless the body says "priority": "normal" or "bulk"; "tenant" (the
+    supervisor or group id) is the fair-queueing key and "timeout" a
+    deadline in seconds, past which a still-queued request gets a 503.
+    """
+
+    def __init__(self, client=None, cache=None, model=None, scheduler=None):
+        self.client = client or prompt.make_client()
+        self.cache = cache
+        self.scheduler = scheduler or scheduling.Scheduler()
+        self.flights = coalesce.SingleFlight()
+        self.model = model or prompt.MODEL
+        self.preamble = prompt.few_shots()
+        self.config = prompt.generation_config()
+        self._routes = {"/evaluate": self._evaluate_input, "/compare": self._compare_input}
+
+    def _evaluate_input(self, body):
+        return prompt.evaluation_prompt(body["text"])
+
+    def _compare_input(self, body):
+        return prompt.comparison_prompt(body["description_1"], body["description_2"])
+
+    async def stream(self, user_input, priority=scheduling.INTERACTIVE, tenant=None, timeout=None):
+        """Yield response text chunks for one request.
+
+        Identical requests of the same priority in flight at the same time
+        share one upstream call (see coalesce.SingleFlight), so an
+        interactive request never waits behind a bulk one it joined. The
+        first one's tenant and timeout apply to the shared call.
+        """
+        contents = [*self.preamble, prompt.user_turn(user_input)]
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.model, contents, self.config)
+            cached = self.cache.get(key)
+            if cached is not None:
+                for text in cached:
+                    yield text
+                return
+
+        async for text in self.flights.stream(
+            (priority, self.flights.key(self.model, contents, self.config)),
+            lambda: self._upstream(contents, key, priority, tenant, timeout),
+        ):
+            yield text
+
+    async def _upstream(self, contents, key, priority, tenant, timeout):
+        chunks = []
+        async with self.scheduler.slot(priority, tenant, timeout) as slot:
+            call = instrumentation.track(self.model, prompt.preamble_share(contents))
+            try:
+                async for chunk in await self.client.aio.models.generate_content_stream(
+                    model=self.model,
+                    contents=contents,
+                    config=self.config,
+                ):
+                    slot.first_chunk()
+                    call.chunk(chunk)
+                    text = chunk.text or ""
+                    chunks.append(text)
+                    yield text
+            except Exception as error:
+                call.finish(error)
+                raise
+            finally:
+                call.finish()
+        if key is not None:
+            self.cache.put(key, chunks)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as error:
+                    # The stream position is unknown after a malformed
+                    # request, so answer and close.
+                    await self._send_json(writer, error.status, {"error": str(error)}, False)
+                    break
+                if request is None:
+                    break
+                keep_alive = await self._respond(writer, *request)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, path, version = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "invalid Content-Length")
+        body = await reader.readexactly(length)
+        keep_alive = version.strip() == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        return method, path, body, keep_alive
+
+    async def _respond(self, writer, method, path, body, keep_alive):
+        try:
+            route = self._routes.get(path.split("?", 1)[0])
+            if route is None:
+                raise HTTPError(404, f"unknown path {path}")
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            try:
+                payload = json.loads(body or b"{}")
+                user_input = route(payload)
+                options = {
+                    "priority": scheduling.PRIORITIES[payload.get("priority", "interactive")],
+                    "tenant": payload.get("tenant"),
+                    "timeout": float(payload["timeout"]) if payload.get("timeout") is not None else None,
+                }
+            except (ValueError, KeyError, TypeError) as error:
+                raise HTTPError(400, f"invalid request body: {error}")
+            if payload.get("stream"):
+                return await self._send_stream(writer, user_input, keep_alive, options)
+            else:
+                await self._send_json(writer, 200, await self._complete(user_input, options), keep_alive)
+        except scheduling.DeadlineExceeded as error:
+            await self._send_json(writer, 503, {"error": str(error)}, keep_alive)
+        except HTTPError as error:
+            await self._send_json(writer, error.status, {"error": str(error)}, keep_alive)
+        except Exception as error:
+            await self._send_json(writer, 500, {"error": f"{type(error).__name__}: {error}"}, False)
+            return False
+        return keep_alive
+
+    async def _complete(self, user_input, options):
+        parser = stream_parser.StreamParser()
+        async with contextlib.aclosing(self.stream(user_input, **options)) as chunks:
+            async for text in chunks:
+                parser.feed(text)
+        return {"scores": parser.scores, "response": parser.buffer}
+
+    def _head(self, status, content_type, keep_alive, extra):
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS[status]}",
+            f"Content-Type: {content_type}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *extra,
+        ]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_json(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(self._head(status, "application/json", keep_alive, [f"Content-Length: {len(data)}"]))
+        writer.write(data)
+        await writer.drain()
+
+    async def _send_stream(self, writer, user_input, keep_alive, options):
+        # Closed explicitly so a client that disconnects mid-stream unsubscribes
+        # from the shared upstream call right away.
+        async with contextlib.aclosing(self.stream(user_input, **options)) as chunks:
+            # Fetch the first chunk before committing to a 200 so upstream
+            # errors still produce a proper error response.
+            first = await anext(chunks, None)
+            writer.write(self._head(200, "text/plain; charset=utf-8", keep_alive, ["Transfer-Encoding: chunked"]))
+            text = first
+            try:
+                while text is not None:
+                    data = text.encode("utf-8")
+                    if data:
+                        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+                        await writer.drain()
+                    text = await anext(chunks, None)
+            except Exception:
+                # The status line is already sent; dropping the connection
+                # without the terminating chunk tells the client the body is
+                # incomplete.
+                return False
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return keep_alive
+
+
+async def serve(host="127.0.0.1", port=8080, client=None, cache=None, scheduler=None):
+    service = EvaluationService(client=client, cache=cache, scheduler=scheduler)
+    server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        await server.serve_forever()
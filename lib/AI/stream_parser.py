@@ -0,0 +1,111 @@
+import re
+from collections import namedtuple
+
+CRITERIA = (
+    "Grammar",
+    "Spelling",
+    "Vocabulary",
+    "Clarity",
+    "Coherence",
+    "Diagram Relevance",
+    "Diagram Clarity",
+    "Diagram Accuracy",
+    "Diagram Integration",
+)
+
+SIMILARITY = "similarity"
+TOTAL = "Total Percentage"
+
+ScoreEvent = namedtuple("ScoreEvent", ["field", "value"])
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_PATTERNS = [
+    (SIMILARITY, re.compile(_NUMBER + r"%\**\s+similarity")),
+    (TOTAL, re.compile(r"Total Percentage:\**\s*" + _NUMBER + r"\s*%")),
+]
+# Fallback when the answer has a percentage but not the "N% similarity"
+# wording (same as prompt.parse_similarity).
+_PERCENT_PATTERN = re.compile(_NUMBER + r"%")
+_CRITERION_PATTERN = re.compile(
+    r"(?<!Diagram )\b("
+    + "|".join(sorted(map(re.escape, CRITERIA), key=len, reverse=True))
+    + r")\**:\**\s*"
+    + _NUMBER
+    + r"\s*%"
+)
+
+
+class StreamParser:
+    """Incrementally extract scores from streamed response text.
+
+    Every field is reported once, as soon as its number and trailing "%" have
+    arrived, so a score split across chunks is still parsed correctly.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.scores = {}
+
+    def feed(self, text):
+        """Add a chunk and return the ScoreEvents it completed."""
+        self.buffer += text
+        events = []
+        for field, pattern in _PATTERNS:
+            if field not in self.scores:
+                match = pattern.search(self.buffer)
+                if match:
+                    events.append(self._emit(field, match.group(1)))
+        for match in _CRITERION_PATTERN.finditer(self.buffer):
+            if match.group(1) not in self.scores:
+                events.append(self._emit(match.group(1), match.group(2)))
+        return events
+
+    def _emit(self, field, value):
+        self.scores[field] = float(value)
+        return ScoreEvent(field, self.scores[field])
+
+
+def _close(chunks):
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+def parse_stream(chunks, needed=None):
+    """Yield ScoreEvents from an iterable of chunk texts.
+
+    With `needed` (a collection of field names) the stream is closed as soon
+    as all of them have been parsed, so the rest of the response is never
+    generated or downloaded.
+    """
+    needed = set(needed) if needed is not None else None
+    parser = StreamParser()
+    try:
+        for text in chunks:
+            for event in parser.feed(text):
+                yield event
+            if needed is not None and needed.issubset(parser.scores):
+                return
+    finally:
+        _close(chunks)
+
+
+def first_score(chunks, field=SIMILARITY):
+    """Return the first value parsed for field, stopping the stream there.
+
+    If the whole response has no "N% similarity", the first percentage in it
+    is used, as prompt.parse_similarity does.
+    """
+    parser = StreamParser()
+    try:
+        for text in chunks:
+            parser.feed(text)
+            if field in parser.scores:
+                return parser.scores[field]
+    finally:
+        _close(chunks)
+    if field == SIMILARITY:
+        match = _PERCENT_PATTERN.search(parser.buffer)
+        if match:
+            return float(match.group(1))
+    return None
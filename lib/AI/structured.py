@@ -0,0 +1,221 @@
+import json
+import re
+from dataclasses import dataclass, replace
+
+import prompt
+import stream_parser
+
+JSON_MIME_TYPE = "application/json"
+
+
+@dataclass(slots=True, frozen=True)
+class PlagiarismVerdict:
+    similarity: float
+    similar_points: tuple = ()
+    explanation: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class Evaluation:
+    total: float
+    grammar: float
+    spelling: float
+    vocabulary: float
+    clarity: float
+    coherence: float
+    diagram_relevance: float
+    diagram_clarity: float
+    diagram_accuracy: float
+    diagram_integration: float
+
+
+# Rubric criterion name (as written in the few-shots) -> Evaluation field.
+CRITERION_FIELDS = {name: name.lower().replace(" ", "_") for name in stream_parser.CRITERIA}
+
+PLAGIARISM_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "similarity": {"type": "NUMBER"},
+        "similar_points": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "explanation": {"type": "STRING"},
+    },
+    "required": ["similarity"],
+}
+
+EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {field: {"type": "NUMBER"} for field in ("total", *CRITERION_FIELDS.values())},
+    "required": ["total", *CRITERION_FIELDS.values()],
+}
+
+BATCH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "similarities": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "candidate": {"type": "INTEGER"},
+                    "similarity": {"type": "NUMBER"},
+                },
+                "required": ["candidate", "similarity"],
+            },
+        },
+    },
+    "required": ["similarities"],
+}
+
+_DESCRIPTIONS = re.compile(r"Description 1:\s*(.*?)\s*Description 2:\s*(.*?)\s*Please analyze", re.S)
+
+
+def json_config(schema):
+    return {"response_mime_type": JSON_MIME_TYPE, "response_schema": schema}
+
+
+def _example_answer(text):
+    """Rewrite a free-text few-shot answer as the equivalent JSON answer."""
+    parser = stream_parser.StreamParser()
+    parser.feed(text)
+    scores = parser.scores
+    if stream_parser.SIMILARITY in scores:
+        return {"similarity": scores[stream_parser.SIMILARITY]}
+    if stream_parser.TOTAL in scores and all(name in scores for name in CRITERION_FIELDS):
+        answer = {"total": scores[stream_parser.TOTAL]}
+        answer.update({field: scores[name] for name, field in CRITERION_FIELDS.items()})
+        return answer
+    return None
+
+
+def json_contents(user_input):
+    """The few-shot conversation with every scored answer given as JSON.
+
+    Answers without scores (the evaluation templates) are dropped together
+    with their question.
+    """
+    contents = prompt.build_contents(user_input)
+    converted = []
+    for question, answer in zip(contents[:-1:2], contents[1:-1:2]):
+        example = _example_answer(prompt.content_text(answer))
+        if example is None:
+            continue
+        converted.append(question)
+        converted.append({"role": "model", "parts": [{"text": json.dumps(example)}]})
+    converted.append(contents[-1])
+    return converted
+
+
+def batch_contents(user_input):
+    """One batched few-shot example built from the pairwise few-shots.
+
+    The pairwise examples that share the same Description 1 become a single
+    New Description with numbered candidates and their known similarities.
+    """
+    contents = prompt.build_contents(user_input)
+    examples = {}
+    for question, answer in zip(contents[:-1:2], contents[1:-1:2]):
+        match = _DESCRIPTIONS.search(prompt.content_text(question))
+        similarity = prompt.parse_similarity(prompt.content_text(answer))
+        if match and similarity is not None:
+            examples.setdefault(match.group(1), []).append((match.group(2), similarity))
+    if not examples:
+        return [contents[-1]]
+    new_description, pairs = max(examples.items(), key=lambda item: len(item[1]))
+    example_answer = {
+        "similarities": [
+            {"candidate": number, "similarity": similarity}
+            for number, (_, similarity) in enumerate(pairs, start=1)
+        ]
+    }
+    return [
+        prompt.user_turn(prompt.batch_comparison_prompt(new_description, [d for d, _ in pairs])),
+        {"role": "model", "parts": [{"text": json.dumps(example_answer)}]},
+        contents[-1],
+    ]
+
+
+def decode_verdict(text):
+    data = json.loads(text)
+    return PlagiarismVerdict(
+        similarity=float(data["similarity"]),
+        similar_points=tuple(data.get("similar_points", ())),
+        explanation=data.get("explanation", ""),
+    )
+
+
+def decode_evaluation(text):
+    data = json.loads(text)
+    return Evaluation(**{field: float(data[field]) for field in Evaluation.__slots__})
+
+
+def _generate_json(user_input, schema, client=None, cache=None):
+    return "".join(
+        prompt.stream_chunks(
+            user_input,
+            cache=cache,
+            client=client,
+            contents=json_contents(user_input),
+            config=json_config(schema),
+        )
+    )
+
+
+def compare(description_1, description_2, client=None, cache=None):
+    user_input = prompt.comparison_prompt(description_1, description_2)
+    return decode_verdict(_generate_json(user_input, PLAGIARISM_SCHEMA, client, cache))
+
+
+def evaluate(document_text, client=None, cache=None, lexical=False):
+    """Rubric scores for a document.
+
+    With lexical=True, Spelling and Vocabulary are measured locally (see
+    lexical.rubric_scores), given to the model as facts and kept as measured.
+    """
+    if not lexical:
+        user_input = prompt.evaluation_prompt(document_text)
+        return decode_evaluation(_generate_json(user_input, EVALUATION_SCHEMA, client, cache))
+    import lexical as lexical_module
+
+    stats = lexical_module.analyze([document_text])
+    scores = lexical_module.rubric_scores(stats)
+    user_input = prompt.evaluation_prompt(document_text, lexical_module.facts(stats, scores))
+    evaluation = decode_evaluation(_generate_json(user_input, EVALUATION_SCHEMA, client, cache))
+    return replace(evaluation, **{CRITERION_FIELDS[name]: value for name, value in scores.items()})
+
+
+def decode_batch(text, keys):
+    """Map the numbered candidates of a batched answer back to keys.
+
+    Candidates missing from the answer are reported as None.
+    """
+    scores = dict.fromkeys(keys)
+    for item in json.loads(text)["similarities"]:
+        number = int(item["candidate"])
+        if 1 <= number <= len(keys):
+            scores[keys[number - 1]] = float(item["similarity"])
+    return scores
+
+
+def compare_batch(new_description, candidates, client=None, cache=None):
+    """Compare new_description with {key: description} in one request."""
+    keys = list(candidates)
+    user_input = prompt.batch_comparison_prompt(new_description, [candidates[key] for key in keys])
+    text = "".join(
+        prompt.stream_chunks(
+            user_input,
+            cache=cache,
+            client=client,
+            contents=batch_contents(user_input),
+            config=json_config(BATCH_SCHEMA),
+        )
+    )
+    return decode_batch(text, keys)
+
+
+def compare_all(new_description, candidates, token_budget=16_000, client=None, cache=None):
+    """Compare against every candidate in as few token-bounded batches as fit."""
+    fixed_tokens = sum(prompt.estimate_tokens(prompt.content_text(content)) for content in batch_contents("")[:-1])
+    scores = {}
+    for keys in prompt.plan_batches(new_description, candidates, token_budget, fixed_tokens):
+        scores.update(compare_batch(new_description, {key: candidates[key] for key in keys}, client, cache))
+    return scores
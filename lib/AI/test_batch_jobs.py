@@ -0,0 +1,62 @@
+import json
+import os
+
+import batch_jobs
+import fake_client
+
+
+def _units(tmp_path, count=3):
+    path = tmp_path / "units.jsonl"
+    units = [{"kind": "compare", "groups": ["a", str(index)], "description_1": "x", "description_2": str(index)}
+             for index in range(count)]
+    path.write_text("".join(json.dumps(unit) + "\n" for unit in units), encoding="utf-8")
+    return str(path)
+
+
+def _handler(monkeypatch, outcomes, calls):
+    """Compare handler that raises outcomes[group] (an exception) or returns a result."""
+
+    def compare(unit, cache):
+        group = unit["groups"][1]
+        calls.append(group)
+        if outcomes.get(group) is not None:
+            raise outcomes[group]
+        return {"similarity": 1.0}
+
+    monkeypatch.setitem(batch_jobs.HANDLERS, "compare", compare)
+
+
+def test_resume_after_a_torn_last_line_does_not_rerun_done_units(tmp_path, monkeypatch):
+    units, journal = _units(tmp_path), str(tmp_path / "journal")
+    calls = []
+    _handler(monkeypatch, {"1": fake_client.FakeAPIError(500)}, calls)
+    assert batch_jobs.run_shard(units, journal) == (2, 1, 0, 0)
+    with open(os.path.join(journal, "journal-0.jsonl"), "a", encoding="utf-8") as file:
+        file.write('{"key": "torn')
+
+    _handler(monkeypatch, {}, calls)
+    assert batch_jobs.run_shard(units, journal) == (1, 0, 2, 0)
+    assert batch_jobs.run_shard(units, journal) == (0, 0, 3, 0)
+    assert calls == ["0", "1", "2", "1"]
+
+
+def test_units_are_given_up_after_max_attempts_but_not_for_quota(tmp_path, monkeypatch, capsys):
+    units, journal = _units(tmp_path), str(tmp_path / "journal")
+    calls = []
+    _handler(monkeypatch, {"1": fake_client.FakeAPIError(429), "2": fake_client.FakeAPIError(500)}, calls)
+
+    results = [batch_jobs.run_shard(units, journal, max_attempts=2) for _ in range(3)]
+
+    assert results == [(1, 2, 0, 0), (0, 2, 1, 0), (0, 1, 1, 1)]
+    assert calls.count("1") == 3 and calls.count("2") == 2
+    batch_jobs.main(["status", "--journal", journal, "--max-attempts", "2"])
+    assert json.loads(capsys.readouterr().out) == {"done": 1, "failed": 1, "given_up": 1}
+
+
+def test_malformed_unit_line_is_counted_once(tmp_path, monkeypatch):
+    units, journal = _units(tmp_path, count=2), str(tmp_path / "journal")
+    with open(units, "a", encoding="utf-8") as file:
+        file.write("not json\n")
+    _handler(monkeypatch, {}, [])
+
+    assert batch_jobs.run_shard(units, journal) == (2, 1, 0, 0)
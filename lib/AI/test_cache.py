@@ -0,0 +1,49 @@
+import itertools
+
+import cache
+
+
+def _cache(tmp_path, monkeypatch, **options):
+    clock = itertools.count(1000.0)
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+    return cache.ResponseCache(str(tmp_path / "cache.sqlite3"), **options)
+
+
+def test_hit_replays_the_chunks(tmp_path, monkeypatch):
+    responses = _cache(tmp_path, monkeypatch)
+    key = responses.key("model", [{"role": "user", "parts": [{"text": "hi"}]}], {"temperature": 0})
+    responses.put(key, ["Similarity ", "Percentage: 5%"])
+
+    assert list(responses.stream(key)) == ["Similarity ", "Percentage: 5%"]
+    assert responses.stream("missing") is None
+
+
+def test_key_depends_on_model_contents_and_config():
+    contents = [{"role": "user", "parts": [{"text": "hi"}]}]
+    key = cache.cache_key("model", contents, {"temperature": 0})
+
+    assert key == cache.cache_key("model", [dict(contents[0])], {"temperature": 0})
+    assert key != cache.cache_key("other", contents, {"temperature": 0})
+    assert key != cache.cache_key("model", contents, {"temperature": 1})
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    responses = _cache(tmp_path, monkeypatch, max_entries=2)
+    responses.put("a", ["1"])
+    responses.put("b", ["2"])
+    responses.get("a")
+    responses.put("c", ["3"])
+
+    assert len(responses) == 2
+    assert responses.get("b") is None
+    assert responses.get("a") == ["1"] and responses.get("c") == ["3"]
+
+
+def test_expired_entry_is_a_miss(tmp_path, monkeypatch):
+    responses = _cache(tmp_path, monkeypatch, ttl=5)
+    responses.put("a", ["1"])
+    for _ in range(10):
+        cache.time.time()
+
+    assert responses.get("a") is None
+    assert len(responses) == 0
@@ -0,0 +1,70 @@
+import itertools
+import random
+
+import cascade
+import prompt
+
+
+def _descriptions():
+    descriptions = []
+    for description_1, description_2, _ in prompt.few_shot_comparisons():
+        descriptions.extend(text for text in (description_1, description_2) if text not in descriptions)
+    return descriptions
+
+
+def _rewrite(text, share, seed=0):
+    rng = random.Random(seed)
+    words = text.split()
+    for index in rng.sample(range(len(words)), int(len(words) * share)):
+        words[index] = f"other{index}"
+    return " ".join(words)
+
+
+def _cascade(scores):
+    calls = []
+
+    def model_scorer(description_1, description_2, cache=None, client=None, model=None):
+        calls.append(model)
+        return scores[model]
+
+    return cascade.Cascade(cheap_model="cheap", large_model="large", model_scorer=model_scorer), calls
+
+
+def test_unrelated_few_shot_pairs_are_settled_locally():
+    decider, calls = _cascade({"cheap": 0.0, "large": 0.0})
+
+    verdicts = [decider.decide(text_1, text_2) for text_1, text_2 in itertools.combinations(_descriptions(), 2)]
+
+    assert len(verdicts) == 15
+    assert all(verdict.tier == cascade.LOCAL and not verdict.plagiarised for verdict in verdicts)
+    assert calls == []
+
+
+def test_near_copy_is_settled_locally():
+    decider, calls = _cascade({"cheap": 0.0, "large": 0.0})
+    original = _descriptions()[0]
+
+    verdict = decider.decide(original, _rewrite(original, 0.05))
+
+    assert verdict.tier == cascade.LOCAL and verdict.plagiarised
+    assert calls == []
+
+
+def test_rewritten_copy_goes_to_the_cheap_model():
+    decider, calls = _cascade({"cheap": 90.0, "large": 0.0})
+    original = _descriptions()[1]
+
+    verdict = decider.decide(original, _rewrite(original, 0.5))
+
+    assert verdict == cascade.Verdict(90.0, True, cascade.CHEAP, "cheap")
+    assert calls == ["cheap"]
+
+
+def test_cheap_score_near_the_threshold_goes_to_the_large_model():
+    decider, calls = _cascade({"cheap": 55.0, "large": 30.0})
+    original = _descriptions()[2]
+
+    verdict = decider.decide(original, _rewrite(original, 0.5))
+
+    assert verdict == cascade.Verdict(30.0, False, cascade.LARGE, "large")
+    assert calls == ["cheap", "large"]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import coalesce
+
+
+def _upstream(chunks, calls, delay=0.01, error=None):
+    async def start():
+        calls.append(1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+        if error is not None:
+            raise error
+
+    return start
+
+
+async def _collect(flights, key, start):
+    return [chunk async for chunk in flights.stream(key, start)]
+
+
+def test_concurrent_identical_requests_share_one_call():
+    async def run():
+        flights, calls = coalesce.SingleFlight(), []
+        start = _upstream(["a", "b", "c"], calls)
+        results = await asyncio.gather(*[_collect(flights, "key", start) for _ in range(3)])
+        return results, len(calls), flights.coalesced, len(flights)
+
+    results, calls, coalesced, open_flights = asyncio.run(run())
+
+    assert results == [["a", "b", "c"]] * 3
+    assert (calls, coalesced, open_flights) == (1, 2, 0)
+
+
+def test_late_subscriber_replays_earlier_chunks():
+    async def run():
+        flights, calls = coalesce.SingleFlight(), []
+        start = _upstream(["a", "b", "c"], calls, delay=0.02)
+        first = asyncio.create_task(_collect(flights, "key", start))
+        await asyncio.sleep(0.03)
+        second = await _collect(flights, "key", start)
+        return await first, second, len(calls)
+
+    assert asyncio.run(run()) == (["a", "b", "c"], ["a", "b", "c"], 1)
+
+
+def test_error_reaches_every_subscriber():
+    async def run():
+        flights, calls = coalesce.SingleFlight(), []
+        start = _upstream(["a"], calls, error=RuntimeError("upstream failed"))
+        return await asyncio.gather(*[_collect(flights, "key", start) for _ in range(2)], return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_upstream_is_cancelled_when_every_subscriber_leaves():
+    async def run():
+        flights, calls = coalesce.SingleFlight(), []
+        start = _upstream(["a"] * 100, calls)
+        task = asyncio.create_task(_collect(flights, "key", start))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return len(flights)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_whitespace_variants_share_a_key():
+    def contents(text):
+        return [{"role": "user", "parts": [{"text": text}]}]
+
+    key = coalesce.request_key("model", contents("A  booking\napp"), {})
+
+    assert key == coalesce.request_key("model", contents("A booking app "), {})
+    assert key != coalesce.request_key("model", contents("A booking site"), {})
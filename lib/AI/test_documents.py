@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+import documents
+import fake_client
+import fanout
+import structured
+
+
+def _document(tmp_path, sections):
+    path = tmp_path / "report.txt"
+    path.write_text("\n\n".join(sections), encoding="utf-8")
+    return str(path)
+
+
+def _responder(contents):
+    text = fake_client.last_user_text(contents)
+    if "broken" in text:
+        return "not json"
+    score = 80.0 if "strong" in text else 40.0
+    return json.dumps({field: score for field in structured.Evaluation.__slots__})
+
+
+def _evaluate(path, **options):
+    client = fake_client.FakeClient(responder=_responder)
+    return asyncio.run(documents.evaluate_document(path, fanout.FanOut(client), max_tokens=60, **options))
+
+
+def _section(word, number):
+    return f"Chapter {number}\n\n" + " ".join([f"This {word} section explains part {number} of the system."] * 4)
+
+
+def test_every_chunk_is_scored_and_weighted(tmp_path):
+    path = _document(tmp_path, [_section("strong", 1), _section("plain", 2)])
+
+    result = _evaluate(path)
+
+    assert result.complete and result.chunks == result.scored_chunks == 2
+    assert result.coverage == 1.0 and result.errors == ()
+    assert 40.0 < result.evaluation.total < 80.0
+
+
+def test_failed_chunks_are_reported(tmp_path):
+    sections = [_section("strong", number) for number in range(1, 10)] + [_section("broken", 10)]
+    path = _document(tmp_path, sections)
+
+    result = _evaluate(path)
+
+    assert not result.complete
+    assert (result.chunks, result.scored_chunks) == (10, 9)
+    assert 0.85 < result.coverage < 0.95
+    assert len(result.errors) == 1
+    assert result.evaluation.total == 80.0
+
+
+def test_too_few_scored_chunks_fail_the_document(tmp_path):
+    path = _document(tmp_path, [_section("strong", 1), _section("broken", 2), _section("broken", 3)])
+
+    with pytest.raises(documents.IncompleteEvaluation, match="1 of 3 chunks"):
+        _evaluate(path)
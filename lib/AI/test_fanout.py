@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import fake_client
+import fanout
+import prompt
+
+
+def _collect(fan_out, inputs):
+    async def run():
+        return [result async for result in fan_out.map(inputs)]
+
+    return asyncio.run(run())
+
+
+def _max_overlap(records):
+    events = sorted([(record.start, 1) for record in records] + [(record.end, -1) for record in records])
+    current = peak = 0
+    for _, step in events:
+        current += step
+        peak = max(peak, current)
+    return peak
+
+
+def test_retries_retryable_errors_until_success():
+    client = fake_client.FakeClient(error_rate=0.5, seed=3)
+    fan_out = fanout.FanOut(client, max_retries=10, base_delay=0.001, max_delay=0.002)
+
+    results = dict(_collect(fan_out, {key: f"input {key}" for key in range(10)}))
+
+    assert all(isinstance(text, str) for text in results.values())
+    assert client.calls > 10
+
+
+def test_gives_up_after_max_retries():
+    client = fake_client.FakeClient(error_rate=1.0, error_code=503)
+    fan_out = fanout.FanOut(client, max_retries=2, base_delay=0.001, max_delay=0.001)
+
+    [(key, error)] = _collect(fan_out, {"a": "input"})
+
+    assert key == "a"
+    assert isinstance(error, fake_client.FakeAPIError) and error.code == 503
+    assert client.calls == 3
+
+
+def test_does_not_retry_client_errors():
+    client = fake_client.FakeClient(error_rate=1.0, error_code=400)
+    fan_out = fanout.FanOut(client, base_delay=0.001)
+
+    [(_, error)] = _collect(fan_out, {"a": "input"})
+
+    assert error.code == 400
+    assert client.calls == 1
+
+
+def test_backoff_is_exponential_and_capped(monkeypatch):
+    monkeypatch.setattr(fanout.random, "uniform", lambda low, high: high)
+    fan_out = fanout.FanOut(fake_client.FakeClient(), base_delay=1.0, max_delay=8.0)
+
+    assert [fan_out._backoff(attempt) for attempt in range(6)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+
+def test_token_bucket_paces_after_burst():
+    async def run():
+        bucket = fanout.TokenBucket(per_minute=1200, burst=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # One token up front, then one every 50 ms.
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_results_arrive_in_completion_order():
+    client = fake_client.FakeClient(
+        responder=lambda contents: "x" * (640 if "slow" in fake_client.last_user_text(contents) else 10),
+        chunk_size=64,
+        chunk_delay=0.02,
+    )
+
+    results = _collect(fanout.FanOut(client), {"slow": "slow", "fast": "fast"})
+
+    assert [key for key, _ in results] == ["fast", "slow"]
+
+
+def test_concurrency_is_bounded():
+    client = fake_client.FakeClient(latency=0.02)
+    fan_out = fanout.FanOut(client, concurrency=3)
+
+    results = _collect(fan_out, {key: f"input {key}" for key in range(12)})
+
+    assert len(results) == 12
+    assert _max_overlap(client.records) <= 3
+
+
+def test_token_bucket_is_charged_for_the_contents_sent(monkeypatch):
+    charged = []
+
+    async def acquire(self, amount=1):
+        charged.append(amount)
+
+    monkeypatch.setattr(fanout.TokenBucket, "acquire", acquire)
+    fan_out = fanout.FanOut(fake_client.FakeClient(), tokens_per_minute=100_000)
+    contents = [prompt.user_turn("x" * 400)]
+
+    asyncio.run(fan_out.generate("ignored", contents=contents))
+    asyncio.run(fan_out.generate("y" * 40))
+
+    assert charged == [100, prompt.preamble_tokens() + prompt.contents_tokens([prompt.user_turn("y" * 40)])]
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import lexical
+
+
+def test_build_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "lexicon.txt")
+
+    assert lexical.Lexicon.build(["3", "Report/MS", "report", "record", "recording"], path) == 3
+
+    lexicon = lexical.Lexicon.load(path)
+    assert len(lexicon) == 3
+    assert "reports" in lexicon and "recorded" in lexicon and "rekord" not in lexicon
+    assert os.listdir(tmp_path) == ["lexicon.txt"]
+
+
+def test_failed_build_leaves_the_old_lexicon(tmp_path):
+    path = str(tmp_path / "lexicon.txt")
+    lexical.Lexicon.build(["report"], path)
+
+    def words():
+        yield "record"
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        lexical.Lexicon.build(words(), path)
+
+    assert os.listdir(tmp_path) == ["lexicon.txt"]
+    assert len(lexical.Lexicon.load(path)) == 1
+
+
+def test_default_lexicon_is_built_from_a_system_word_list(tmp_path, monkeypatch):
+    wordlist = tmp_path / "en_US.dic"
+    wordlist.write_text("4\nthe\nsystem/S\nstudent\nhelp\n", encoding="utf-8")
+    monkeypatch.setattr(lexical, "SYSTEM_WORDLISTS", (str(wordlist),))
+    monkeypatch.setattr(lexical, "LEXICON_PATH", str(tmp_path / "lexicon.txt"))
+    lexical.default_lexicon.cache_clear()
+    try:
+        stats = lexical.analyze(["The system helps students. The sistem"])
+    finally:
+        lexical.default_lexicon.cache_clear()
+
+    assert (tmp_path / "lexicon.txt").exists()
+    assert stats.oov_examples == ("sistem",)
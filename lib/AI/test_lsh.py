@@ -0,0 +1,55 @@
+import random
+
+import fake_client
+import lsh
+import prompt
+
+
+def _few_shot_descriptions():
+    descriptions = []
+    for description_1, description_2, _ in prompt.few_shot_comparisons():
+        descriptions.extend(text for text in (description_1, description_2) if text not in descriptions)
+    return descriptions
+
+
+def _paraphrase(text, share, seed):
+    rng = random.Random(seed)
+    words = text.split()
+    for index in rng.sample(range(len(words)), int(len(words) * share)):
+        words[index] = f"other{index}"
+    return " ".join(words)
+
+
+def test_bands_catch_the_threshold_with_the_requested_recall():
+    index = lsh.MinHashLSH(threshold=0.2, num_perm=256, recall=0.99)
+
+    assert index.bands * index.rows <= 256
+    assert lsh.collision_probability(0.2, index.bands, index.rows) >= 0.99
+
+
+def test_few_shot_corpus_needs_an_order_of_magnitude_fewer_calls():
+    descriptions = _few_shot_descriptions()
+    groups = {f"group-{number}": text for number, text in enumerate(descriptions)}
+    client = fake_client.FakeClient()
+
+    for group_id, text in groups.items():
+        prompt.check_plagiarism(text, groups, exclude=group_id, client=client)
+
+    # Every description against every other: len * (len - 1) calls without the pre-filter.
+    assert len(descriptions) == 6
+    assert client.calls * 10 <= len(descriptions) * (len(descriptions) - 1)
+
+
+def test_lightly_paraphrased_copies_still_collide():
+    descriptions = _few_shot_descriptions()
+    for seed in range(30):
+        original = descriptions[seed % len(descriptions)]
+        index = lsh.MinHashLSH(seed=seed)
+        index.add("original", original)
+
+        assert "original" in index.query(_paraphrase(original, 0.25, seed))
+
+
+def test_stopwords_do_not_count():
+    assert lsh.content_words("The system of the students") == ["system", "students"]
+    assert lsh.shingles("the app and the app", 2, lsh.STOPWORDS) == {"app app"}
@@ -0,0 +1,73 @@
+import pytest
+
+import pair_store
+
+
+def _store(tmp_path):
+    return pair_store.PairStore(str(tmp_path / "pairs.sqlite3"))
+
+
+def _row_count(store):
+    return store._db.execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+
+
+def test_register_scores_the_new_row_only(tmp_path):
+    store = _store(tmp_path)
+    store.register("a", "library booking system")
+    store.register("b", "library event planner")
+
+    assert store.register("c", "clinic booking app") == 2
+    assert set(store.scores("c")) == {"a", "b"}
+    assert store.register("c", "clinic booking app") == 0
+
+
+def test_failing_model_score_leaves_no_group_row(tmp_path):
+    store = _store(tmp_path)
+    store.register("a", "library booking system")
+
+    def failing(description_1, description_2):
+        raise RuntimeError("quota")
+
+    with pytest.raises(RuntimeError):
+        store.register("b", "library event planner", model_score=failing)
+
+    assert _row_count(store) == 1
+    assert store.scores("b") == {}
+    assert store.register("b", "library event planner", model_score=lambda first, second: 40.0) == 1
+    assert store.scores("b")["a"].model_score == 40.0
+
+
+def test_changed_description_replaces_its_row(tmp_path):
+    store = _store(tmp_path)
+    store.register("a", "library booking system")
+    store.register("b", "library event planner")
+    before = store.scores("b")["a"].local_score
+
+    assert store.register("b", "library booking system") == 1
+    assert store.scores("b")["a"].local_score == 1.0 != before
+
+
+def test_incomplete_row_is_recomputed(tmp_path):
+    store = _store(tmp_path)
+    store.register("a", "library booking system")
+    store.register("b", "library event planner")
+    store.register("c", "clinic booking app")
+    store._db.execute("DELETE FROM pairs WHERE group_a = 'a' AND group_b = 'c'")
+    store._db.commit()
+
+    assert store.register("a", "library booking system") == 2
+    assert set(store.scores("a")) == {"b", "c"}
+
+
+def test_group_registered_while_scoring_is_included(tmp_path):
+    store = _store(tmp_path)
+    store.register("a", "library booking system")
+
+    def score_and_register_another(description_1, description_2):
+        if "c" not in {row[0] for row in store._db.execute("SELECT group_id FROM groups")}:
+            store.register("c", "clinic booking app")
+        return 10.0
+
+    assert store.register("b", "library event planner", model_score=score_and_register_another) == 2
+    assert set(store.scores("b")) == {"a", "c"}
+    assert set(store.scores("c")) == {"a", "b"}
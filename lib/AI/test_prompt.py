@@ -0,0 +1,22 @@
+import io
+
+import prompt
+
+
+def test_malformed_line_is_reported_without_stopping_the_run():
+    source = io.StringIO('{"id": 1}\n\nnot json\n{"id": 2}\n')
+
+    results = list(prompt.run_pipeline(prompt.read_jsonl(source), lambda record: {"id": record["id"]}, workers=2))
+
+    assert results[0] == {"id": 1}
+    assert results[1]["line"] == 3 and results[1]["error"].startswith("JSONDecodeError")
+    assert results[2] == {"id": 2}
+
+
+def test_failing_handler_yields_an_error_record():
+    def handler(record):
+        raise ValueError("bad record")
+
+    [result] = prompt.run_pipeline([{"id": 7}], handler)
+
+    assert result == {"id": 7, "error": "ValueError: bad record"}
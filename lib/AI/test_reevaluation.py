@@ -0,0 +1,57 @@
+import reevaluation
+import structured
+
+
+def _gate(tmp_path):
+    calls = []
+
+    def evaluate(text):
+        calls.append(text)
+        return structured.Evaluation(*[float(len(calls))] * 10)
+
+    return reevaluation.ReevaluationGate(str(tmp_path / "reevaluations.sqlite3"), evaluate=evaluate), calls
+
+
+def _paragraphs(count):
+    return [
+        f"Paragraph {index} covers module {index} with terms alpha{index} beta{index} gamma{index} delta{index}"
+        f" and explains how part {index} of the platform works for students."
+        for index in range(count)
+    ]
+
+
+def test_unchanged_text_reuses_the_result(tmp_path):
+    gate, calls = _gate(tmp_path)
+    text = "\n\n".join(_paragraphs(6))
+
+    first = gate.evaluate_group("g", text)
+    second = gate.evaluate_group("g", text + " ")
+
+    assert not first.reused and second.reused
+    assert second.evaluation == first.evaluation
+    assert len(calls) == 1
+
+
+def test_changed_paragraph_is_evaluated_with_one_call(tmp_path):
+    gate, calls = _gate(tmp_path)
+    paragraphs = _paragraphs(6)
+    gate.evaluate_group("g", "\n\n".join(paragraphs))
+
+    paragraphs[2] = "A different paragraph about mobile payments, ledgers and new offline requirements entirely."
+    result = gate.evaluate_group("g", "\n\n".join(paragraphs))
+
+    assert not result.reused
+    assert len(calls) == 2
+    assert calls[-1] == "\n\n".join(paragraphs)
+
+
+def test_deleting_most_of_the_text_is_evaluated_again(tmp_path):
+    gate, calls = _gate(tmp_path)
+    paragraphs = _paragraphs(10)
+    gate.evaluate_group("g", "\n\n".join(paragraphs))
+
+    result = gate.evaluate_group("g", paragraphs[0])
+
+    assert not result.reused
+    assert result.changed > 0.5
+    assert len(calls) == 2
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+import fake_client
+import scheduler
+
+
+def _fixed(limit):
+    return scheduler.AIMDLimit(initial=limit, minimum=min(limit, 2), maximum=limit, latency_tolerance=0)
+
+
+async def _hold(sched, release, admitted, name, priority=scheduler.NORMAL, tenant=None, timeout=None):
+    async with sched.slot(priority, tenant, timeout):
+        admitted.append(name)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_reserve_keeps_a_slot_for_interactive_requests():
+    async def run():
+        sched = scheduler.Scheduler(_fixed(4), reserve=0.25)
+        release, admitted = asyncio.Event(), []
+        tasks = [asyncio.create_task(_hold(sched, release, admitted, f"bulk{i}", scheduler.BULK)) for i in range(6)]
+        await _settle()
+        bulk_running = sched.in_flight
+        tasks.append(asyncio.create_task(_hold(sched, release, admitted, "interactive", scheduler.INTERACTIVE)))
+        await _settle()
+        result = bulk_running, sched.in_flight, "interactive" in admitted
+        release.set()
+        await asyncio.gather(*tasks)
+        return result
+
+    assert asyncio.run(run()) == (3, 4, True)
+
+
+def test_minimum_limit_leaves_interactive_a_slot():
+    sched = scheduler.Scheduler(scheduler.AIMDLimit(initial=2))
+
+    assert sched._capacity(scheduler.BULK) == 1
+    assert sched._capacity(scheduler.INTERACTIVE) == 2
+    with pytest.raises(ValueError):
+        scheduler.Scheduler(scheduler.AIMDLimit(minimum=1))
+
+
+def _admission_order(requests):
+    """Names in the order they get the single slot; requests are (name, priority, tenant)."""
+
+    async def run():
+        sched = scheduler.Scheduler(_fixed(1), reserve=0)
+        admitted = []
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(_hold(sched, gate, admitted, "blocker"))
+        await _settle()
+
+        async def one(name, priority, tenant):
+            async with sched.slot(priority, tenant):
+                admitted.append(name)
+
+        tasks = []
+        for request in requests:
+            tasks.append(asyncio.create_task(one(*request)))
+            await _settle()
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        return admitted[1:]
+
+    return asyncio.run(run())
+
+
+def test_higher_priority_classes_go_first():
+    order = _admission_order([
+        ("bulk", scheduler.BULK, None),
+        ("normal", scheduler.NORMAL, None),
+        ("interactive", scheduler.INTERACTIVE, None),
+    ])
+
+    assert order == ["interactive", "normal", "bulk"]
+
+
+def test_tenants_take_turns_within_a_class():
+    order = _admission_order([
+        ("a1", scheduler.BULK, "a"),
+        ("a2", scheduler.BULK, "a"),
+        ("a3", scheduler.BULK, "a"),
+        ("b1", scheduler.BULK, "b"),
+        ("b2", scheduler.BULK, "b"),
+    ])
+
+    assert order == ["a1", "b1", "a2", "b2", "a3"]
+
+
+def test_request_queued_past_its_deadline_fails():
+    async def run():
+        sched = scheduler.Scheduler(_fixed(1), reserve=0)
+        release, admitted = asyncio.Event(), []
+        blocker = asyncio.create_task(_hold(sched, release, admitted, "blocker"))
+        await _settle()
+        with pytest.raises(scheduler.DeadlineExceeded):
+            async with sched.slot(scheduler.NORMAL, timeout=0.02):
+                admitted.append("late")
+        queued = sched.queued
+        release.set()
+        await blocker
+        return admitted, queued, sched.in_flight
+
+    assert asyncio.run(run()) == (["blocker"], 0, 0)
+
+
+def test_burst_of_429s_shrinks_the_limit_once():
+    async def run():
+        limit = scheduler.AIMDLimit(initial=8, latency_tolerance=0)
+        sched = scheduler.Scheduler(limit)
+        release = asyncio.Event()
+
+        async def overloaded():
+            with pytest.raises(fake_client.FakeAPIError):
+                async with sched.slot(scheduler.INTERACTIVE):
+                    await release.wait()
+                    raise fake_client.FakeAPIError(429)
+
+        tasks = [asyncio.create_task(overloaded()) for _ in range(5)]
+        await _settle()
+        release.set()
+        await asyncio.gather(*tasks)
+        after_burst = limit.limit
+        await overloaded()
+        return after_burst, limit.limit
+
+    assert asyncio.run(run()) == (4.0, 2.0)
+
+
+def test_sustained_latency_inflation_shrinks_the_limit():
+    limit = scheduler.AIMDLimit(initial=32, maximum=32, increase=0, window=10, patience=2)
+    for call in range(20):
+        limit.on_success(float(call), 0.5)
+    for call in range(20, 30):
+        limit.on_success(float(call), 2.0)
+    after_one_window = limit.limit
+    for call in range(30, 40):
+        limit.on_success(float(call), 2.0)
+
+    assert (after_one_window, limit.limit) == (32.0, 16.0)
+
+
+def test_minority_of_slow_calls_does_not_shrink_the_limit():
+    limit = scheduler.AIMDLimit(initial=32, maximum=32, increase=0)
+    latencies = [0.4, 0.5, 0.6, 2.5]
+    for call in range(400):
+        limit.on_success(float(call), latencies[call % len(latencies)])
+
+    assert limit.limit == 32.0
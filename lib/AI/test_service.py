@@ -0,0 +1,162 @@
+import asyncio
+import json
+
+import fake_client
+import service
+
+
+def _run(client, exchange):
+    """Run exchange(reader, writer) against a service on a local socket."""
+
+    async def run():
+        evaluation = service.EvaluationService(client=client)
+        server = await asyncio.start_server(evaluation.handle, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            try:
+                return await exchange(reader, writer)
+            finally:
+                writer.close()
+
+    return asyncio.run(run())
+
+
+def _request(path, payload=None, method="POST", headers=()):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(body)}", *headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        chunks = []
+        while size := int((await reader.readline()).strip(), 16):
+            chunks.append((await reader.readexactly(size + 2))[:-2].decode("utf-8"))
+        await reader.readline()
+        return status, headers, chunks
+    return status, headers, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+def _exchange(client, *requests):
+    async def exchange(reader, writer):
+        responses = []
+        for request in requests:
+            writer.write(request)
+            await writer.drain()
+            responses.append(await _read_response(reader))
+        return responses
+
+    return _run(client, exchange)
+
+
+def test_compare_returns_parsed_scores():
+    client = fake_client.FakeClient()
+
+    [(status, _, body)] = _exchange(client, _request("/compare", {"description_1": "a", "description_2": "b"}))
+
+    assert status == 200
+    assert "similarity" in body["scores"]
+    assert client.calls == 1
+
+
+def test_evaluate_returns_parsed_scores():
+    [(status, _, body)] = _exchange(fake_client.FakeClient(), _request("/evaluate", {"text": "A report."}))
+
+    assert status == 200
+    assert body["scores"] and body["response"]
+
+
+def test_stream_uses_chunked_encoding():
+    client = fake_client.FakeClient(responder=lambda contents: "Similarity Percentage: 42%", chunk_size=8)
+
+    [(status, headers, chunks)] = _exchange(
+        client, _request("/compare", {"description_1": "a", "description_2": "b", "stream": True})
+    )
+
+    assert status == 200
+    assert headers["transfer-encoding"] == "chunked"
+    assert len(chunks) > 1
+    assert "".join(chunks) == "Similarity Percentage: 42%"
+
+
+def test_bad_body_is_rejected():
+    client = fake_client.FakeClient()
+
+    responses = _exchange(
+        client,
+        _request("/compare", {"description_1": "only one"}),
+        _request("/evaluate", {"text": "x", "priority": "urgent"}),
+    )
+
+    assert [status for status, _, _ in responses] == [400, 400]
+    assert client.calls == 0
+
+
+def test_unknown_path_and_method():
+    responses = _exchange(fake_client.FakeClient(), _request("/missing", {}), _request("/evaluate", method="GET"))
+
+    assert [status for status, _, _ in responses] == [404, 405]
+
+
+def test_keep_alive_serves_several_requests_on_one_connection():
+    client = fake_client.FakeClient()
+
+    responses = _exchange(client, *[_request("/evaluate", {"text": f"report {index}"}) for index in range(3)])
+
+    assert [status for status, _, _ in responses] == [200, 200, 200]
+    assert all(headers["connection"] == "keep-alive" for _, headers, _ in responses)
+
+
+def _last_exchange(request):
+    """The response to request and whatever the server sends before closing."""
+
+    async def exchange(reader, writer):
+        writer.write(request)
+        await writer.drain()
+        response = await _read_response(reader)
+        return response, await reader.read()
+
+    return _run(fake_client.FakeClient(), exchange)
+
+
+def test_connection_close_is_honoured():
+    (status, headers, _), rest = _last_exchange(_request("/evaluate", {"text": "x"}, headers=["Connection: close"]))
+
+    assert status == 200
+    assert headers["connection"] == "close"
+    assert rest == b""
+
+
+def test_malformed_request_line_gets_400():
+    (status, headers, _), rest = _last_exchange(b"GARBAGE\r\n\r\n")
+
+    assert status == 400
+    assert headers["connection"] == "close"
+    assert rest == b""
+
+
+def test_invalid_content_length_gets_400():
+    (status, _, body), _ = _last_exchange(b"POST /evaluate HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_identical_requests_share_a_call_only_within_a_priority():
+    async def run(priorities):
+        client = fake_client.FakeClient(latency=0.05)
+        evaluation = service.EvaluationService(client=client)
+
+        async def collect(priority):
+            return "".join([text async for text in evaluation.stream("same input", priority=priority)])
+
+        results = await asyncio.gather(*[collect(priority) for priority in priorities])
+        return client.calls, len(set(results))
+
+    assert asyncio.run(run([service.scheduling.INTERACTIVE] * 2)) == (1, 1)
+    assert asyncio.run(run([service.scheduling.INTERACTIVE, service.scheduling.BULK])) == (2, 1)
@@ -0,0 +1,41 @@
+import random
+import string
+
+import tfidf_index
+
+
+def _cohort(size, words_per_group=40, seed=0):
+    rng = random.Random(seed)
+    return {
+        f"group-{index:03d}": " ".join(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+            for _ in range(words_per_group)
+        )
+        for index in range(size)
+    }
+
+
+def test_every_group_matches_its_own_text_past_the_feature_budget(tmp_path):
+    items = _cohort(300)
+    index = tfidf_index.TfidfIndex.build(str(tmp_path), items, max_features=8192)
+
+    assert len(index.terms) == 8192
+    assert any(term.startswith("c:") for term in index.terms)
+    for key in ("group-000", "group-150", "group-299"):
+        assert index.query(items[key], k=1)[0][0] == key
+
+
+def test_small_cohort_keeps_every_word(tmp_path):
+    items = {"a": "library booking system", "b": "library event planner", "c": "clinic booking app"}
+    index = tfidf_index.TfidfIndex.build(str(tmp_path), items)
+
+    assert {"w:library", "w:booking", "w:system", "w:event", "w:planner", "w:clinic", "w:app"} <= set(index.terms)
+    assert index.query("clinic booking app", k=1)[0][0] == "c"
+
+
+def test_added_group_is_found(tmp_path):
+    items = _cohort(20)
+    index = tfidf_index.TfidfIndex.build(str(tmp_path), items)
+    index.add("new", items["group-007"])
+
+    assert {key for key, _ in index.query(items["group-007"], k=2)} == {"group-007", "new"}
@@ -0,0 +1,183 @@
+# To run this code you need to install the following dependencies:
+# pip install numpy
+
+import collections
+import json
+import math
+import os
+
+import numpy as np
+
+from lsh import tokenize
+
+MATRIX_FILE = "matrix.f32"
+VOCABULARY_FILE = "vocabulary.json"
+
+
+def features(text, char_ngrams=(3, 5)):
+    """Word and character n-gram counts for one description.
+
+    Character n-grams are taken inside word boundaries so misspelt or
+    inflected words still share most of their features.
+    """
+    counts = collections.Counter()
+    low, high = char_ngrams
+    for word in tokenize(text):
+        counts["w:" + word] += 1
+        padded = f" {word} "
+        for size in range(low, high + 1):
+            for i in range(len(padded) - size + 1):
+                counts["c:" + padded[i:i + size]] += 1
+    return counts
+
+
+def _atomic_write_json(path, data):
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+class TfidfIndex:
+    """TF-IDF nearest-neighbour index over group descriptions.
+
+    Rows are sublinear term frequencies stored in a memory-mapped float32
+    matrix; the vocabulary, document frequencies and row keys live in a JSON
+    file next to it. IDF weighting is applied at query time, so appending a
+    group only writes one row and updates document frequencies.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, VOCABULARY_FILE), encoding="utf-8") as file:
+            meta = json.load(file)
+        self.terms = meta["terms"]
+        self.df = np.asarray(meta["df"], dtype=np.float64)
+        self.keys = meta["keys"]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._matrix = None
+        self._norms = None
+        self._map()
+
+    @classmethod
+    def build(cls, path, items, max_features=8192, ngram_share=0.5):
+        """Create an index at path from {key: description}.
+
+        The vocabulary holds up to max_features terms. At least ngram_share
+        of them go to the character n-grams shared by at least two
+        descriptions, the rest to words; either side's unused room goes to
+        the other. Within each side the terms found in most descriptions
+        come first. Later appends are projected onto this vocabulary: terms
+        first seen in an appended group are ignored until the index is
+        rebuilt.
+        """
+        os.makedirs(path, exist_ok=True)
+        keys = list(items)
+        counts = [features(items[key]) for key in keys]
+        document_frequency = collections.Counter()
+        for count in counts:
+            document_frequency.update(count.keys())
+        words = sorted(
+            (term for term in document_frequency if term.startswith("w:")),
+            key=lambda term: (-document_frequency[term], term),
+        )
+        ngrams = sorted(
+            (term for term in document_frequency if term.startswith("c:") and document_frequency[term] > 1),
+            key=lambda term: (-document_frequency[term], term),
+        )
+        ngrams = ngrams[:max(max_features - len(words), int(max_features * ngram_share))]
+        vocabulary = words[:max_features - len(ngrams)] + ngrams
+        terms = {term: column for column, term in enumerate(vocabulary)}
+
+        with open(os.path.join(path, MATRIX_FILE), "wb") as file:
+            for count in counts:
+                file.write(_row(count, terms).tobytes())
+        _atomic_write_json(
+            os.path.join(path, VOCABULARY_FILE),
+            {"terms": terms, "df": [document_frequency[term] for term in vocabulary], "keys": keys},
+        )
+        return cls(path)
+
+    def _map(self):
+        size = os.path.getsize(os.path.join(self.path, MATRIX_FILE))
+        if size == 0 or not self.terms:
+            self._matrix = np.zeros((0, len(self.terms)), dtype=np.float32)
+        else:
+            self._matrix = np.memmap(
+                os.path.join(self.path, MATRIX_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self.keys), len(self.terms)),
+            )
+        self._norms = None
+
+    def _idf(self):
+        return np.log((1.0 + len(self.keys)) / (1.0 + self.df)) + 1.0
+
+    def _row_norms(self, weights, block=1024):
+        if self._norms is None:
+            squared = weights ** 2
+            norms = np.empty(len(self.keys), dtype=np.float64)
+            for start in range(0, len(self.keys), block):
+                rows = np.asarray(self._matrix[start:start + block], dtype=np.float64)
+                norms[start:start + block] = np.sqrt((rows ** 2) @ squared)
+            self._norms = norms
+        return self._norms
+
+    def add(self, key, text):
+        """Append a new group, or rewrite the row of an existing one."""
+        row = _row(features(text), self.terms)
+        if key in self._rows:
+            index = self._rows[key]
+            self.df -= np.asarray(self._matrix[index]) > 0
+            with open(os.path.join(self.path, MATRIX_FILE), "r+b") as file:
+                file.seek(index * row.nbytes)
+                file.write(row.tobytes())
+        else:
+            with open(os.path.join(self.path, MATRIX_FILE), "ab") as file:
+                file.write(row.tobytes())
+            self._rows[key] = len(self.keys)
+            self.keys.append(key)
+        self.df += row > 0
+        _atomic_write_json(
+            os.path.join(self.path, VOCABULARY_FILE),
+            {"terms": self.terms, "df": self.df.astype(int).tolist(), "keys": self.keys},
+        )
+        self._map()
+
+    def query(self, text, k=10, exclude=None):
+        """Return up to k (key, cosine similarity) pairs, best first."""
+        if not self.keys:
+            return []
+        idf = self._idf()
+        query = _row(features(text), self.terms).astype(np.float64) * idf
+        query_norm = math.sqrt(float(query @ query))
+        if query_norm == 0.0:
+            return []
+        norms = self._row_norms(idf)
+        scores = (self._matrix @ (query * idf)) / (np.where(norms == 0, 1.0, norms) * query_norm)
+        if exclude in self._rows:
+            scores[self._rows[exclude]] = -1.0
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.keys[row], float(scores[row])) for row in best if scores[row] > 0]
+
+    def candidates(self, text, k=20, threshold=0.1, exclude=None):
+        """Keys of the groups worth sending to generate() for a comparison."""
+        return {key for key, score in self.query(text, k, exclude) if score >= threshold}
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def _row(counts, terms):
+    row = np.zeros(len(terms), dtype=np.float32)
+    for term, count in counts.items():
+        column = terms.get(term)
+        if column is not None:
+            row[column] = 1.0 + math.log(count)
+    return row